@@ -0,0 +1,151 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+def copy_instance(instance):
+    """Копия объекта модели без общего с оригиналом кэша связей."""
+    instance = copy.copy(instance)
+    instance._state = copy.copy(instance._state)
+    instance._state.fields_cache = {}
+    return instance
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш воркера со сроком жизни записей."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (None, 0))
+            if expires <= time.monotonic():
+                self._data.pop(key, None)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SharedCache:
+    """Записи в общем бэкенде из CACHES: видны всем воркерам."""
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+class TokenCache:
+    """Соответствие токен -> (пользователь, токен) для аутентификации.
+
+    Ключ — хэш токена, чтобы сам токен не попадал в кэш. Без
+    AUTH_TOKEN_CACHE_ALIAS записи хранятся в памяти воркера, и после
+    выхода другие воркеры узнают об этом не позже
+    AUTH_TOKEN_CACHE_TIMEOUT секунд.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self.create_backend()
+        return self._backend
+
+    @staticmethod
+    def create_backend():
+        if settings.AUTH_TOKEN_CACHE_ALIAS:
+            return SharedCache(
+                settings.AUTH_TOKEN_CACHE_ALIAS,
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+        return LRUCache(
+            settings.AUTH_TOKEN_CACHE_MAX_SIZE,
+            settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+    @staticmethod
+    def get_key(token_key):
+        digest = hashlib.sha256(token_key.encode()).hexdigest()
+        return f"auth:token:{digest}"
+
+    def get(self, token_key):
+        credentials = self.backend.get(self.get_key(token_key))
+        if credentials is None:
+            return None
+
+        return self.copy_credentials(*credentials)
+
+    def set(self, token_key, credentials):
+        self.backend.set(
+            self.get_key(token_key), self.copy_credentials(*credentials)
+        )
+
+    @staticmethod
+    def copy_credentials(user, token):
+        """Представления меняют request.user, поэтому каждому запросу
+        нужна своя копия записи из кэша."""
+        user, token = copy_instance(user), copy_instance(token)
+        token.user = user
+        return user, token
+
+    def invalidate(self, *token_keys):
+        """Удаление записей сразу и еще раз после коммита: между ними
+        запись могли заполнить данными до изменения."""
+        keys = [self.get_key(token_key) for token_key in token_keys]
+
+        def delete():
+            for key in keys:
+                self.backend.delete(key)
+
+        delete()
+        transaction.on_commit(delete)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к базе при попадании в кэш."""
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        return credentials
@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import io
+import threading
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, urlencode
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import IngredientSerializer, TagSerializer
+from foodgram.db.routers import PRIMARY, read_from
+from recipes.models import Ingredient, Tag
+
+INGREDIENTS_VERSION_KEY = "ingredients:catalog:version"
+TAGS_VERSION_KEY = "tags:registry:version"
+RECIPES_VERSION_KEY = "recipes:responses:version"
+
+
+def get_version(key):
+    """Текущая версия данных из кэша default.
+
+    Версия нужна только для инвалидации и не истекает, пока данные не
+    изменились. С общим бэкендом она одна на все воркеры и команды; с
+    кэшем в памяти процесса смену версии видит только изменивший данные
+    процесс (проверка api.W001).
+    """
+    return cache.get_or_set(key, uuid.uuid4().hex, None)
+
+
+def bump_version(key):
+    """Новая версия данных: все снимки со старой версией устаревают.
+
+    Версия меняется после коммита, чтобы снимок не собрали из данных,
+    которые еще не видны другим соединениям.
+    """
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def bump_ingredients_version():
+    bump_version(INGREDIENTS_VERSION_KEY)
+
+
+def bump_tags_version():
+    bump_version(TAGS_VERSION_KEY)
+
+
+def bump_recipes_version():
+    bump_version(RECIPES_VERSION_KEY)
+
+
+def etag_matches(request, *etags):
+    """Совпадает ли If-None-Match запроса с одним из ETag (слабое сравнение).
+    """
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+
+    received = parse_etags(header)
+    if received == ["*"]:
+        return True
+
+    received = {
+        etag[2:] if etag.startswith("W/") else etag for etag in received
+    }
+    return any(etag in received for etag in etags)
+
+
+def gzip_bytes(content):
+    """Сжатие без метки времени, чтобы результат зависел только от данных."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gzip_file:
+        gzip_file.write(content)
+
+    return buffer.getvalue()
+
+
+SnapshotData = namedtuple(
+    "SnapshotData", ("content", "gzip_content", "etag", "index")
+)
+
+
+class Snapshot:
+    """Сериализованный снимок данных, пересобираемый при смене версии.
+
+    В памяти воркера хранятся байты ответа, их gzip-версия, ETag (хэш
+    байтов — одинаковый у всех воркеров) и индекс для поиска без
+    запросов к базе (если build его возвращает); для ответа 304 база не
+    нужна.
+    """
+
+    def __init__(self, version_key, build):
+        self.version_key = version_key
+        self.build = build
+        self._current = (None, None)
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.version_key)
+
+        current_version, data = self._current
+        if version == current_version:
+            return data
+
+        with self._lock:
+            current_version, data = self._current
+            if version != current_version:
+                # Снимок живет до следующей смены версии, поэтому
+                # собирается из основной базы, а не из отстающей реплики.
+                with read_from(PRIMARY):
+                    content, index = self.build()
+                data = SnapshotData(
+                    content,
+                    gzip_bytes(content),
+                    hashlib.sha256(content).hexdigest(),
+                    index,
+                )
+                self._current = (version, data)
+
+        return data
+
+    def response(self, request):
+        """Ответ со снимком: 304 по ETag или (сжатые) байты снимка."""
+        data = self.get()
+        etag, gzip_etag = f'"{data.etag}"', f'"{data.etag}-gzip"'
+        use_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+        if etag_matches(request, etag, gzip_etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                data.gzip_content if use_gzip else data.content,
+                content_type="application/json",
+            )
+            if use_gzip:
+                response["Content-Encoding"] = "gzip"
+
+        response["ETag"] = gzip_etag if use_gzip else etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        return response
+
+
+class ResponseCache:
+    """Кэш готовых JSON-ответов для анонимных GET-запросов.
+
+    Ключ — версия данных, схема и хост, действие и нормализованная строка
+    запроса, поэтому смена версии сразу делает недоступными все старые
+    ответы без перебора ключей; старые записи вытесняет сам кэш по
+    таймауту.
+    """
+
+    def __init__(self, version_key, prefix):
+        self.version_key = version_key
+        self.prefix = prefix
+
+    @staticmethod
+    def is_cacheable(request):
+        return (
+            request.method == "GET"
+            and not request.user.is_authenticated
+            and request.accepted_renderer.format == "json"
+        )
+
+    def get_key(self, request, action, pk=None):
+        query = urlencode(
+            sorted(
+                (key, sorted(values))
+                for key, values in request.query_params.lists()
+            ),
+            doseq=True,
+        )
+        # В ответе абсолютные адреса изображений и ссылок на страницы.
+        origin = f"{request.scheme}://{request.get_host()}"
+        digest = hashlib.md5(
+            f"{origin}:{action}:{pk}:{query}".encode()
+        ).hexdigest()
+        return f"{self.prefix}:{get_version(self.version_key)}:{digest}"
+
+    def response(self, request, action, get_response, pk=None):
+        """Ответ из кэша или от get_response с сохранением после рендера.
+        """
+        if not self.is_cacheable(request):
+            return get_response()
+
+        key = self.get_key(request, action, pk)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = get_response()
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key,
+                    (rendered.content, rendered["Content-Type"]),
+                    settings.RECIPES_CACHE_TIMEOUT,
+                )
+            )
+
+        return response
+
+
+def build_ingredients_catalog():
+    content = JSONRenderer().render(
+        IngredientSerializer(Ingredient.objects.all(), many=True).data
+    )
+    return content, None
+
+
+def build_tags_registry():
+    """Список тегов и соответствие слаг -> id."""
+    tags = list(Tag.objects.all())
+    content = JSONRenderer().render(TagSerializer(tags, many=True).data)
+    return content, {tag.slug: tag.id for tag in tags if tag.slug}
+
+
+ingredients_catalog = Snapshot(
+    INGREDIENTS_VERSION_KEY, build_ingredients_catalog
+)
+tags_registry = Snapshot(TAGS_VERSION_KEY, build_tags_registry)
+recipes_cache = ResponseCache(RECIPES_VERSION_KEY, "recipes:response")
+
+
+def get_tag_ids(slugs):
+    """{слаг: id} найденных тегов по реестру тегов.
+
+    Реестр сверяется с версией тегов на каждом вызове; в базе ищутся
+    только слаги, которых в нем нет.
+    """
+    index = tags_registry.get().index
+    tag_ids = {slug: index[slug] for slug in slugs if slug in index}
+    unknown = set(slugs) - tag_ids.keys()
+    if unknown:
+        tag_ids.update(
+            Tag.objects.filter(slug__in=unknown).values_list("slug", "id")
+        )
+
+    return tag_ids
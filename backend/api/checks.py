@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def is_local_cache(alias="default"):
+    """Кэш виден только текущему процессу."""
+    return settings.CACHES[alias]["BACKEND"] in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии снимков ингредиентов, тегов и ответов при нескольких
+    воркерах требуют общего кэша."""
+    if not is_local_cache() or settings.WEB_CONCURRENCY <= 1:
+        return []
+
+    return [
+        Warning(
+            "Кэш default хранится в памяти процесса, а воркеров "
+            f"{settings.WEB_CONCURRENCY}: смену версии данных из другого "
+            "воркера воркер не увидит.",
+            hint=(
+                "Задайте общий CACHE_BACKEND, например "
+                "django.core.cache.backends.filebased.FileBasedCache."
+            ),
+            id="api.W001",
+        )
+    ]
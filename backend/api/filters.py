@@ -1,31 +1,80 @@
-from django_filters import ModelMultipleChoiceFilter
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Recipe, Tag
+from api.cache import get_tag_ids
+from recipes.constants import TagMask
+from recipes.counters import get_tags_mask
+from recipes.models import Favorite, Recipe, RecipeTags, ShoppingCart
+from recipes.search import search_recipes
 from users.models import User
 
 
+class TagSlugsField(forms.Field):
+    """Слаги тегов (?tags=a&tags=b), очищенное значение — id тегов."""
+
+    widget = forms.SelectMultiple
+    default_error_messages = {
+        "invalid_choice": "Тег %(value)s не найден.",
+    }
+
+    def to_python(self, value):
+        if not value:
+            return []
+
+        tag_ids = get_tag_ids(value)
+        for slug in value:
+            if slug not in tag_ids:
+                raise ValidationError(
+                    self.error_messages["invalid_choice"],
+                    code="invalid_choice",
+                    params={"value": slug},
+                )
+
+        return [tag_ids[slug] for slug in value]
+
+
+class TagSlugsFilter(filters.Filter):
+    field_class = TagSlugsField
+
+
 class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method="favorited_method")
     is_in_shopping_cart = filters.BooleanFilter(
         method="in_shopping_cart_method"
     )
-    tags = ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        to_field_name="slug",
-        queryset=Tag.objects.all(),
-    )
+    tags = TagSlugsFilter(method="tags_method")
+    search = filters.CharFilter(method="search_method")
 
     def favorited_method(self, queryset, name, value):
         if value:
-            return queryset.filter(
-                favorite__user=self.request.user.id)
+            return queryset.filter(id__in=Favorite.objects.filter(
+                user=self.request.user.id
+            ).values("recipe_id"))
         return queryset
 
+    def tags_method(self, queryset, name, value):
+        """Любой из тегов value (id) по битовой маске рецепта, без JOIN."""
+        condition = Q(tag_bits__gt=0)
+        unmasked = [tag_id for tag_id in value if tag_id > TagMask.MAX_TAG_ID]
+        if unmasked:
+            condition |= Q(id__in=RecipeTags.objects.filter(
+                tag__in=unmasked
+            ).values("recipe_id"))
+
+        return queryset.annotate(
+            tag_bits=F("tags_mask").bitand(get_tags_mask(value))
+        ).filter(condition)
+
+    def search_method(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def in_shopping_cart_method(self, queryset, name, value):
         if value:
-            return queryset.filter(
-                shopping_list__user=self.request.user.id)
+            return queryset.filter(id__in=ShoppingCart.objects.filter(
+                user=self.request.user.id
+            ).values("recipe_id"))
         return queryset
 
     class Meta:
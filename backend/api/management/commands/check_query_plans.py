@@ -0,0 +1,200 @@
+import re
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.utils import get_local_host
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from users.models import User
+
+# Чтение всей таблицы или всего покрывающего индекса; SCAN по обычному
+# индексу — обход в порядке ORDER BY, который останавливается на LIMIT.
+SQLITE_FULL_SCAN = re.compile(
+    r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: USING COVERING INDEX \w+)?$"
+)
+# COUNT без условий читает таблицу (или ее самый узкий индекс) всегда.
+FULL_COUNT = re.compile(
+    r"^SELECT COUNT\(\*\)(?: AS \S+)? FROM "
+    r"(?:\S+|\(SELECT \S+ AS \S+ FROM \S+\) subquery)$"
+)
+# Полные чтения, которых план избежать не может: условие по битовой
+# маске тегов B-дерево не обслуживает, поэтому COUNT с фильтром по тегам
+# читает таблицу (в SQLite — узкий индекс recipe_tags_mask_idx) целиком.
+# Страница при этом идет по индексу (-pub_date, -id) до LIMIT.
+EXPECTED_COUNT_SCANS = {("/api/recipes/?tags=", "recipes_recipe")}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN для основных запросов API на заполненной базе. "
+        "Завершается ошибкой, если в плане есть последовательное чтение "
+        "большой таблицы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="Email пользователя, от имени которого идут запросы",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="С какого числа строк таблица считается большой",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(
+                f"EXPLAIN не поддерживается для {connection.vendor}."
+            )
+
+        user = self.get_user(options["user"])
+        large_tables = self.get_large_tables(options["min_rows"])
+        client = APIClient(HTTP_HOST=get_local_host())
+        client.force_authenticate(user)
+
+        violations = []
+        for url in self.get_urls(user):
+            # Первый запрос собирает снимки воркера (реестр тегов и др.),
+            # замеряется установившийся режим.
+            self.request(client, url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(client, url)
+            if response.status_code >= 400:
+                raise CommandError(f"{url}: ответ {response.status_code}.")
+
+            scans, expected = self.get_large_scans(
+                url, queries.captured_queries, large_tables
+            )
+            violations.extend(f"{url}: {table}" for table in sorted(scans))
+            self.stdout.write(
+                f"{url}: запросов {len(queries)}, "
+                f"полных чтений {len(scans)}, ожидаемых {len(expected)}"
+            )
+
+        if violations:
+            raise CommandError(
+                "Последовательное чтение больших таблиц:\n"
+                + "\n".join(violations)
+            )
+
+        self.stdout.write(self.style.SUCCESS("Планы запросов в порядке."))
+
+    @staticmethod
+    def request(client, url):
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def get_large_scans(self, url, queries, large_tables):
+        """Полные чтения больших таблиц: недопустимые и ожидаемые."""
+        scans, expected = set(), set()
+        for query in queries:
+            if FULL_COUNT.match(query["sql"]):
+                continue
+            for table in self.get_full_scans(query["sql"]):
+                if table not in large_tables:
+                    continue
+                if self.is_expected(url, query["sql"], table):
+                    expected.add(table)
+                else:
+                    scans.add(table)
+
+        return scans, expected
+
+    @staticmethod
+    def is_expected(url, sql, table):
+        return sql.startswith("SELECT COUNT(*)") and any(
+            url.startswith(prefix) and table == expected_table
+            for prefix, expected_table in EXPECTED_COUNT_SCANS
+        )
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            cart = ShoppingCart.objects.order_by("user").first()
+            user = cart.user if cart else User.objects.first()
+
+        if user is None:
+            raise CommandError("В базе нет пользователей.")
+
+        return user
+
+    def get_large_tables(self, min_rows):
+        tables = set()
+        with connection.cursor() as cursor:
+            for model in apps.get_models():
+                table = model._meta.db_table
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}"
+                )
+                if cursor.fetchone()[0] >= min_rows:
+                    tables.add(table)
+
+        return tables
+
+    def get_urls(self, user):
+        """Основные запросы API с параметрами из заполненной базы."""
+        urls = [
+            "/api/recipes/",
+            "/api/recipes/?cursor=",
+            "/api/recipes/?is_favorited=1",
+            "/api/recipes/?is_in_shopping_cart=1",
+            "/api/users/subscriptions/?recipes_limit=3",
+            "/api/recipes/download_shopping_cart/",
+        ]
+
+        tag = Tag.objects.exclude(slug=None).first()
+        if tag:
+            urls.append(f"/api/recipes/?tags={tag.slug}")
+
+        recipe = Recipe.objects.first()
+        if recipe:
+            urls.append(f"/api/recipes/?author={recipe.author_id}")
+            urls.append(f"/api/recipes/{recipe.id}/")
+            urls.append(f"/api/recipes/?search={recipe.name.split()[0]}")
+
+        ingredient = Ingredient.objects.first()
+        if ingredient:
+            urls.append(f"/api/ingredients/?name={ingredient.name[:3]}")
+
+        return urls
+
+    def get_full_scans(self, sql):
+        """Таблицы, которые план запроса читает целиком."""
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                return self.get_postgresql_scans(cursor.fetchone()[0][0])
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [
+                match.group(1)
+                for match in (
+                    SQLITE_FULL_SCAN.match(row[-1])
+                    for row in cursor.fetchall()
+                )
+                if match
+            ]
+
+    def get_postgresql_scans(self, node):
+        node = node.get("Plan", node)
+        scans = []
+        # Index Only Scan без условия по индексу читает весь индекс.
+        if node["Node Type"].endswith("Seq Scan") or (
+            node["Node Type"] == "Index Only Scan"
+            and "Index Cond" not in node
+        ):
+            scans.append(node["Relation Name"])
+
+        for child in node.get("Plans", ()):
+            scans.extend(self.get_postgresql_scans(child))
+
+        return scans
@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.utils import get_local_host
+from recipes.models import Recipe, Tag
+from users.models import User
+
+# Кэш ответов отключается, иначе второй режим получит ответ первого.
+NO_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение ответов списка и карточки рецептов, собранных "
+        "RecipeSerializer и api.representations, байт в байт. "
+        "Завершается ошибкой при любом расхождении."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=3,
+            help="Сколько пользователей проверить, кроме анонимного",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=50,
+            help="Размер страницы при обходе списка",
+        )
+
+    def handle(self, *args, **options):
+        users = [None] + list(
+            User.objects.filter(shopping_list__isnull=False)
+            .distinct()
+            .order_by("id")[:options["users"]]
+        )
+
+        mismatches = []
+        checked = 0
+        with override_settings(CACHES=NO_CACHE):
+            for user in users:
+                client = APIClient(HTTP_HOST=get_local_host())
+                client.force_authenticate(user)
+                for url in self.get_urls(user, options["page_size"]):
+                    checked += 1
+                    if not self.is_same(client, url):
+                        mismatches.append(f"{user or 'аноним'}: {url}")
+
+        self.stdout.write(f"Проверено ответов: {checked}.")
+        if mismatches:
+            raise CommandError(
+                "Ответы различаются:\n" + "\n".join(mismatches)
+            )
+
+        self.stdout.write(self.style.SUCCESS("Ответы совпадают."))
+
+    @staticmethod
+    def is_same(client, url):
+        responses = []
+        for fast_read in (False, True):
+            with override_settings(RECIPES_FAST_READ=fast_read):
+                response = client.get(url)
+            responses.append((response.status_code, response.content))
+
+        return responses[0] == responses[1]
+
+    @staticmethod
+    def get_urls(user, page_size):
+        total = Recipe.objects.count()
+        for page in range(1, total // page_size + 2):
+            yield f"/api/recipes/?limit={page_size}&page={page}"
+        yield f"/api/recipes/?limit={page_size}&cursor="
+
+        tag = Tag.objects.exclude(slug=None).first()
+        if tag is not None:
+            yield f"/api/recipes/?tags={tag.slug}&limit={page_size}"
+        recipe = Recipe.objects.first()
+        if recipe is not None:
+            yield f"/api/recipes/?author={recipe.author_id}"
+            yield f"/api/recipes/?search={recipe.name.split()[0]}"
+        if user is not None:
+            yield "/api/recipes/?is_favorited=1"
+            yield "/api/recipes/?is_in_shopping_cart=1"
+
+        for recipe_id in Recipe.objects.values_list("id", flat=True):
+            yield f"/api/recipes/{recipe_id}/"
+        yield "/api/recipes/0/"
+        yield "/api/recipes/abc/"
@@ -0,0 +1,96 @@
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.middleware import get_sticky_key
+from api.utils import get_local_host
+from foodgram.db.routers import PRIMARY, get_replicas
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка маршрутизации по репликам: чтения API идут в реплику, "
+        "после записи чтения того же клиента — в основную базу. "
+        "Завершается ошибкой, если запросы ушли не туда."
+    )
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError("Реплики не настроены (DB_REPLICAS).")
+
+        user = User.objects.order_by("id").first()
+        recipe = Recipe.objects.exclude(favorite__user=user).first()
+        if user is None or recipe is None:
+            raise CommandError("Нужны пользователь и рецепт.")
+
+        token, _ = Token.objects.get_or_create(user=user)
+        credentials = f"Token {token.key}"
+        cache.delete(get_sticky_key(credentials))
+        client = self.get_client(credentials)
+
+        # Первый запрос заполняет кэш токенов: токен читается из основной.
+        self.request(client, "get", "/api/users/me/")
+
+        # Клиент без cookie (только токен) узнается по отметке в кэше.
+        token_client = self.get_client(credentials)
+        favorite = f"/api/recipes/{recipe.id}/favorite/"
+        errors = []
+        try:
+            steps = (
+                (client, "get", "/api/recipes/", replicas),
+                (client, "post", favorite, [PRIMARY]),
+                (client, "get", "/api/recipes/", [PRIMARY]),
+                (token_client, "get", "/api/recipes/", [PRIMARY]),
+                (client, "delete", favorite, [PRIMARY]),
+            )
+            for step_client, method, url, expected in steps:
+                used = self.request(step_client, method, url)
+                self.stdout.write(f"{method.upper()} {url}: {used}")
+                if not used or not set(used) <= set(expected):
+                    errors.append(f"{method.upper()} {url}: {used}")
+        finally:
+            Favorite.objects.filter(user=user, recipe=recipe).delete()
+            cache.delete(get_sticky_key(credentials))
+
+        if errors:
+            raise CommandError(
+                "Запросы ушли не в ту базу:\n" + "\n".join(errors)
+            )
+
+        self.stdout.write(self.style.SUCCESS("Маршрутизация верна."))
+
+    @staticmethod
+    def get_client(credentials):
+        client = APIClient(HTTP_HOST=get_local_host())
+        client.credentials(HTTP_AUTHORIZATION=credentials)
+        return client
+
+    @staticmethod
+    def request(client, method, url):
+        """Число SQL-запросов ответа по алиасам баз."""
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in connections
+            }
+            response = getattr(client, method)(url)
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{method.upper()} {url}: {response.status_code}"
+            )
+
+        return {
+            alias: len(context)
+            for alias, context in contexts.items()
+            if len(context)
+        }
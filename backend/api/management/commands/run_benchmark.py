@@ -0,0 +1,291 @@
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.utils import get_local_host
+from recipes.models import Ingredient, ShoppingCart, Tag
+from users.models import User
+
+QUERIES_IN_SERVER_TIMING = re.compile(r'db;[^,]*desc="(\d+) queries"')
+GUNICORN_START_TIMEOUT = 30
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def get_queries(server_timing):
+    match = QUERIES_IN_SERVER_TIMING.search(server_timing or "")
+    return int(match.group(1)) if match else None
+
+
+class LocalClient:
+    """Запросы через URLconf в текущем процессе."""
+
+    def __init__(self, token):
+        self.client = APIClient(
+            HTTP_HOST=get_local_host(), HTTP_AUTHORIZATION=f"Token {token}"
+        )
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    def get(self, url):
+        response = self.client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code, response.get("Server-Timing")
+
+
+class HttpClient:
+    """Запросы к запущенному серверу (например, gunicorn)."""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Token {token}"
+
+    def get(self, url):
+        response = self.session.get(f"{self.base_url}{url}")
+        return response.status_code, response.headers.get("Server-Timing")
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер основных запросов API: p50/p95/p99, запросы к базе, "
+        "пропускная способность и сравнение с сохраненным результатом"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--user", type=str, help="Email пользователя для запросов"
+        )
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            help=(
+                "Адрес запущенного сервера вместо тестового клиента; "
+                "число запросов к базе он отдает при SERVER_TIMING_PUBLIC"
+            ),
+        )
+        parser.add_argument(
+            "--gunicorn",
+            action="store_true",
+            help="Запустить локальный gunicorn на время замера",
+        )
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--output", type=str, default="benchmark.json",
+            help="Файл для результатов в JSON",
+        )
+        parser.add_argument(
+            "--baseline", type=str, help="Файл с результатами для сравнения"
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=0.2,
+            help="Допустимый рост p95 относительно baseline (доля)",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests должно быть не меньше 1.")
+
+        user = self.get_user(options["user"])
+        token = Token.objects.get_or_create(user=user)[0].key
+
+        server = None
+        base_url = options["base_url"]
+        if options["gunicorn"]:
+            server, base_url = self.start_gunicorn(options["workers"])
+
+        try:
+            client = (
+                HttpClient(base_url, token) if base_url else LocalClient(token)
+            )
+            results = {
+                name: self.measure(client, url, options)
+                for name, url in self.get_endpoints()
+            }
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "mode": base_url or "test-client",
+            "requests": options["requests"],
+            "endpoints": results,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+
+        self.print_report(results)
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options)
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            cart = (
+                ShoppingCart.objects.values("user")
+                .annotate(recipes=Count("recipe"))
+                .order_by("-recipes")
+                .first()
+            )
+            user = (
+                User.objects.filter(id=cart["user"]).first() if cart
+                else User.objects.first()
+            )
+
+        if user is None:
+            raise CommandError(
+                "Нет пользователей: заполните базу командой seed_data."
+            )
+
+        return user
+
+    def get_endpoints(self):
+        endpoints = [
+            ("recipes", "/api/recipes/"),
+            ("subscriptions", "/api/users/subscriptions/?recipes_limit=3"),
+            ("download_shopping_cart", "/api/recipes/download_shopping_cart/"),
+        ]
+
+        tag = Tag.objects.exclude(slug=None).first()
+        if tag:
+            endpoints.append(
+                ("recipes_by_tag", f"/api/recipes/?tags={tag.slug}")
+            )
+
+        ingredient = Ingredient.objects.first()
+        if ingredient:
+            endpoints.append((
+                "ingredients_search",
+                f"/api/ingredients/?name={ingredient.name[:3]}",
+            ))
+
+        return endpoints
+
+    def measure(self, client, url, options):
+        for _ in range(options["warmup"]):
+            client.get(url)
+
+        latencies = []
+        queries = []
+        started = time.perf_counter()
+        for _ in range(options["requests"]):
+            request_started = time.perf_counter()
+            status, server_timing = client.get(url)
+            latencies.append(time.perf_counter() - request_started)
+            if status >= 400:
+                raise CommandError(f"{url}: ответ {status}.")
+            query_count = get_queries(server_timing)
+            if query_count is not None:
+                queries.append(query_count)
+        elapsed = time.perf_counter() - started
+
+        return {
+            "url": url,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries": (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+        }
+
+    def start_gunicorn(self, workers):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        server = subprocess.Popen(
+            (
+                "gunicorn", "foodgram.wsgi:application",
+                "--bind", f"127.0.0.1:{port}",
+            ),
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "SERVER_TIMING_PUBLIC": "True",
+                # gunicorn и настройки Django читают число воркеров отсюда.
+                "WEB_CONCURRENCY": str(workers),
+            },
+        )
+        deadline = time.monotonic() + GUNICORN_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn завершился при запуске.")
+            try:
+                socket.create_connection(("127.0.0.1", port), 1).close()
+            except OSError:
+                time.sleep(0.2)
+            else:
+                return server, f"http://{get_local_host()}:{port}"
+
+        server.terminate()
+        raise CommandError("gunicorn не запустился вовремя.")
+
+    def print_report(self, results):
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']} мс, "
+                f"p95 {result['p95_ms']} мс, p99 {result['p99_ms']} мс, "
+                f"запросов {result['queries']}, "
+                f"{result['throughput_rps']} зап/с"
+            )
+
+    def compare(self, results, baseline_path, options):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)["endpoints"]
+
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+
+            # p95 в baseline мог округлиться до нуля: отношение не считаем.
+            if previous["p95_ms"] > 0:
+                growth = result["p95_ms"] / previous["p95_ms"] - 1
+                if growth > options["max_regression"]:
+                    regressions.append(f"{name}: p95 вырос на {growth:.0%}")
+            if (
+                result["queries"] is not None
+                and previous.get("queries") is not None
+                and result["queries"] > previous["queries"]
+            ):
+                regressions.append(
+                    f"{name}: запросов {previous['queries']} -> "
+                    f"{result['queries']}"
+                )
+
+        if regressions:
+            raise CommandError(
+                "Регрессии относительно baseline:\n" + "\n".join(regressions)
+            )
+
+        self.stdout.write(self.style.SUCCESS("Регрессий нет."))
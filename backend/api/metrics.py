@@ -0,0 +1,219 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from rest_framework import serializers
+from rest_framework.serializers import LIST_SERIALIZER_KWARGS
+
+from foodgram.db.pool import get_pools_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_METRICS = (
+    ("in_use", "gauge", "Соединения пула, выданные потокам."),
+    ("idle", "gauge", "Свободные соединения пула."),
+    ("max_size", "gauge", "Наибольший размер пула."),
+    ("waits", "counter", "Ожидания свободного соединения."),
+    ("timeouts", "counter", "Ожидания, завершившиеся ошибкой."),
+    ("opened", "counter", "Открытые пулом соединения."),
+    ("discarded", "counter", "Закрытые пулом соединения."),
+)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Метрики одного запроса: SQL, сериализация, общее время."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ", ".join((
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialize_time * 1000:.1f}",
+            f"total;dur={self.total_time * 1000:.1f}",
+        ))
+
+
+def start_request():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def end_request():
+    _local.metrics = None
+
+
+@contextmanager
+def serialize_timer():
+    """Время сериализации; вложенные сериализаторы не считаются дважды."""
+    metrics = getattr(_local, "metrics", None)
+    if metrics is None:
+        yield
+        return
+
+    metrics.serialize_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_depth -= 1
+        if not metrics.serialize_depth:
+            metrics.serialize_time += time.perf_counter() - started
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with serialize_timer():
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Учет времени сериализации в метриках запроса."""
+
+    @property
+    def data(self):
+        with serialize_timer():
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        allow_empty = kwargs.pop("allow_empty", None)
+        list_kwargs = {
+            key: value for key, value in kwargs.items()
+            if key in LIST_SERIALIZER_KWARGS
+        }
+        if allow_empty is not None:
+            list_kwargs["allow_empty"] = allow_empty
+
+        return TimedListSerializer(
+            *args, child=cls(*args, **kwargs), **list_kwargs
+        )
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, (None, 0.0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = ",".join(
+                f'{key}="{value}"' for key, value in labels
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+
+        return lines
+
+
+def render_pools_stats(pools_stats):
+    """Статистика пулов соединений с базой в формате Prometheus."""
+    lines = []
+    for key, kind, description in POOL_METRICS:
+        name = f"foodgram_db_pool_{key}"
+        if kind == "counter":
+            name += "_total"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for alias, stats in sorted(pools_stats.items()):
+            lines.append(f'{name}{{alias="{alias}"}} {stats[key]}')
+
+    return lines
+
+
+class MetricsRegistry:
+    """Гистограммы по маршрутам, накопленные в памяти воркера."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duration = Histogram(
+            "foodgram_request_duration_seconds",
+            "Полное время обработки запроса.",
+            DURATION_BUCKETS,
+        )
+        self.sql_duration = Histogram(
+            "foodgram_request_sql_duration_seconds",
+            "Время SQL-запросов за запрос.",
+            DURATION_BUCKETS,
+        )
+        self.serialize_duration = Histogram(
+            "foodgram_request_serialize_duration_seconds",
+            "Время сериализации ответа.",
+            DURATION_BUCKETS,
+        )
+        self.queries = Histogram(
+            "foodgram_request_queries",
+            "Количество SQL-запросов за запрос.",
+            QUERY_COUNT_BUCKETS,
+        )
+
+    def observe(self, labels, metrics):
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            self.duration.observe(labels, metrics.total_time)
+            self.sql_duration.observe(labels, metrics.sql_time)
+            self.serialize_duration.observe(labels, metrics.serialize_time)
+            self.queries.observe(labels, metrics.queries)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for histogram in (
+                self.duration,
+                self.sql_duration,
+                self.serialize_duration,
+                self.queries,
+            ):
+                lines.extend(histogram.render())
+
+        pools_stats = get_pools_stats()
+        if pools_stats:
+            lines.extend(render_pools_stats(pools_stats))
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
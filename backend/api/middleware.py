@@ -0,0 +1,153 @@
+import hashlib
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.checks import is_local_cache
+from api.metrics import end_request, registry, start_request
+from foodgram.db.routers import get_replicas, read_from
+
+API_PREFIX = "/api/"
+
+
+def get_route_labels(request, response):
+    """Метки маршрута: viewset и action DRF или имя view Django."""
+    status = f"{response.status_code // 100}xx"
+    match = request.resolver_match
+    if match is None:
+        return {"view": "unmatched", "action": "", "status": status}
+
+    view_class = getattr(match.func, "cls", None)
+    actions = getattr(match.func, "actions", None) or {}
+    return {
+        "view": view_class.__name__ if view_class else match.view_name,
+        "action": actions.get(request.method.lower(), request.method),
+        "status": status,
+    }
+
+
+class MetricsMiddleware:
+    """Количество и время SQL-запросов, время сериализации и ответа.
+
+    Результат накапливается в гистограммах по маршрутам (см.
+    /api/metrics/) и отдается в заголовке Server-Timing персоналу, а при
+    SERVER_TIMING_PUBLIC — всем клиентам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            end_request()
+
+        metrics.finish()
+        user = getattr(request, "user", None)
+        if settings.SERVER_TIMING_PUBLIC or getattr(user, "is_staff", False):
+            response["Server-Timing"] = metrics.server_timing()
+        registry.observe(get_route_labels(request, response), metrics)
+
+        return response
+
+
+def get_sticky_key(credentials):
+    """Ключ кэша с отметкой о недавней записи клиента."""
+    if not credentials:
+        return None
+
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f"db:sticky:{digest}"
+
+
+def get_credentials(request):
+    """Токен или сессия клиента; анонимный клиент своих данных не имеет."""
+    return request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+
+
+def get_response_credentials(response):
+    """Учетные данные, выданные ответом: новая сессия или токен входа."""
+    morsel = response.cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is not None and morsel.value:
+        yield morsel.value
+
+    data = getattr(response, "data", None)
+    if isinstance(data, dict) and data.get("auth_token"):
+        yield f"Token {data['auth_token']}"
+
+
+class ReplicaMiddleware:
+    """Безопасные запросы к API читают из реплики.
+
+    После изменяющего запроса клиент еще DB_REPLICA_STICKY_SECONDS секунд
+    читает из основной базы, чтобы видеть свои изменения, пока они
+    доходят до реплики. Отметка ставится в кэш на токен или сессию
+    запроса и выданные ответом (вход меняет ключ сессии), а клиенту без
+    них (регистрация) — в cookie DB_REPLICA_STICKY_COOKIE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replicas = get_replicas()
+        if not self.replicas:
+            raise MiddlewareNotUsed
+        if is_local_cache() and settings.WEB_CONCURRENCY > 1:
+            raise ImproperlyConfigured(
+                "Реплики при нескольких воркерах требуют общего кэша: "
+                "отметки о записи в памяти процесса не видны другим "
+                "воркерам. Задайте CACHE_BACKEND."
+            )
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            self.mark_sticky(request, response)
+            return response
+
+        if not request.path.startswith(API_PREFIX) or self.is_sticky(
+            request
+        ):
+            return self.get_response(request)
+
+        with read_from(random.choice(self.replicas)):
+            return self.get_response(request)
+
+    @staticmethod
+    def is_sticky(request):
+        if request.COOKIES.get(settings.DB_REPLICA_STICKY_COOKIE):
+            return True
+
+        key = get_sticky_key(get_credentials(request))
+        return key is not None and bool(cache.get(key))
+
+    @staticmethod
+    def mark_sticky(request, response):
+        timeout = settings.DB_REPLICA_STICKY_SECONDS
+        keys = {
+            get_sticky_key(credentials)
+            for credentials in (
+                get_credentials(request),
+                *get_response_credentials(response),
+            )
+        }
+        keys.discard(None)
+        cache.set_many(dict.fromkeys(keys, True), timeout)
+        response.set_cookie(
+            settings.DB_REPLICA_STICKY_COOKIE,
+            "1",
+            max_age=timeout,
+            httponly=True,
+            samesite="Lax",
+        )
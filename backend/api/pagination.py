@@ -1,5 +1,188 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CountPaginator(Paginator):
+    """Подсчет строк без вычисления аннотаций из SELECT.
+
+    Иначе COUNT(*) выполняет подзапросы аннотаций (например,
+    is_favorited) для каждой строки таблицы.
+    """
+
+    @cached_property
+    def count(self):
+        values = getattr(self.object_list, "values", None)
+        if values is None:
+            return len(self.object_list)
+
+        return values("pk").count()
 
 
 class LimitPagination(PageNumberPagination):
+    """Постраничная выдача с параметром limit.
+
+    С параметром cursor (в том числе пустым) включается выдача по ключу
+    сортировки без OFFSET и COUNT: время ответа не зависит от глубины.
+    """
+
+    django_paginator_class = CountPaginator
     page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        return self.paginate_by_cursor(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict((
+            ("next", self.get_cursor_link(self.next_position, False)),
+            ("previous", self.get_cursor_link(self.previous_position, True)),
+            ("results", data),
+        )))
+
+    def get_ordering(self, queryset):
+        """Сортировка queryset, дополненная id для однозначности ключа.
+
+        Ключ строится только по полям модели: сортировка по аннотациям
+        (например, релевантности поиска) в этом режиме не используется.
+        """
+        model_fields = {
+            field.name for field in queryset.model._meta.concrete_fields
+        } | {"pk"}
+        ordering = [
+            field for field in (
+                queryset.query.order_by or queryset.model._meta.ordering
+            )
+            if field.lstrip("-") in model_fields
+        ]
+        if not ordering or ordering[-1].lstrip("-") not in ("id", "pk"):
+            descending = bool(ordering) and ordering[0].startswith("-")
+            ordering.append("-id" if descending else "id")
+
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or not all(
+            isinstance(value, str) for value in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = json.dumps({"p": position, "r": reverse})
+        return b64encode(cursor.encode("ascii")).decode("ascii")
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            # Строка values(): ключ сортировки берется из ее значений.
+            instance = self.model(**{
+                field.lstrip("-"): instance[field.lstrip("-")]
+                for field in self.ordering
+            })
+
+        model_fields = instance._meta
+        return [
+            model_fields.get_field(field.lstrip("-")).value_to_string(instance)
+            for field in self.ordering
+        ]
+
+    def get_cursor_filter(self, queryset, position, reverse):
+        """Условие «строго после позиции» для составного ключа."""
+        model_fields = queryset.model._meta
+        values = []
+        try:
+            for field, value in zip(self.ordering, position):
+                model_field = model_fields.get_field(field.lstrip("-"))
+                values.append(model_field.to_python(value))
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            equal = [
+                Q(**{previous.lstrip("-"): values[number]})
+                for number, previous in enumerate(self.ordering[:index])
+            ]
+            conditions.append(reduce(
+                and_, equal, Q(**{f"{name}__{lookup}": values[index]})
+            ))
+
+        return reduce(or_, conditions)
+
+    def paginate_by_cursor(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            if len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(
+                self.get_cursor_filter(queryset, position, reverse)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results and (has_more or reverse):
+            self.next_position = self.get_position(results[-1])
+        if results and position is not None and (has_more or not reverse):
+            self.previous_position = self.get_position(results[0])
+
+        return results
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(position, reverse),
+        )
@@ -0,0 +1,34 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Формат списка покупок для выбора через ?format=.
+
+    Сам файл отдается потоковым ответом, через рендерер проходят
+    только ответы с ошибками.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class TxtRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class CsvRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class PdfRenderer(ShoppingListRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
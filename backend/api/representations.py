@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+
+from api.metrics import serialize_timer
+from api.serializers import get_absolute_variants
+from recipes.images import get_variant_urls_by_name
+from recipes.models import IngredientInRecipe, Recipe, RecipeTags
+from users.models import Subscription, User
+
+RECIPE_VALUES = (
+    "id",
+    "author_id",
+    "name",
+    "text",
+    "cooking_time",
+    "image",
+    "image_variants_source",
+    "favorites_count",
+    "pub_date",
+    "is_favorited",
+    "is_in_shopping_cart",
+)
+
+
+class RecipeReader:
+    """Рецепты в схеме RecipeSerializer без полей DRF.
+
+    Строки рецептов берутся через values(), авторы, теги и ингредиенты —
+    тремя запросами в словари по id, ответ собирается из обычных
+    словарей в том же порядке ключей. Совпадение с RecipeSerializer
+    проверяет команда check_recipe_representation.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.storage = Recipe._meta.get_field("image").storage
+
+    @staticmethod
+    def get_rows(queryset):
+        return queryset.prefetch_related(None).values(*RECIPE_VALUES)
+
+    def represent(self, rows):
+        rows = list(rows)
+        recipe_ids = [row["id"] for row in rows]
+        authors = self.get_authors({row["author_id"] for row in rows})
+        tags = self.get_tags(recipe_ids)
+        ingredients = self.get_ingredients(recipe_ids)
+
+        with serialize_timer():
+            return [
+                self.represent_recipe(
+                    row,
+                    authors[row["author_id"]],
+                    tags[row["id"]],
+                    ingredients[row["id"]],
+                )
+                for row in rows
+            ]
+
+    def get_authors(self, author_ids):
+        authors = User.objects.filter(pk__in=author_ids).annotate(
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=self.request.user.id, author=OuterRef("pk")
+            ))
+        ).values(
+            "id", "username", "first_name", "last_name", "email",
+            "is_subscribed",
+        )
+        return {
+            author["id"]: {
+                "id": author["id"],
+                "username": author["username"],
+                "first_name": author["first_name"],
+                "last_name": author["last_name"],
+                "email": author["email"],
+                "is_subscribed": author["is_subscribed"],
+            }
+            for author in authors
+        }
+
+    @staticmethod
+    def get_tags(recipe_ids):
+        tags = defaultdict(list)
+        for row in RecipeTags.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by("tag_id").values(
+            "recipe_id", "tag_id", "tag__name", "tag__color", "tag__slug"
+        ):
+            tags[row["recipe_id"]].append({
+                "id": row["tag_id"],
+                "name": row["tag__name"],
+                "color": row["tag__color"],
+                "slug": row["tag__slug"],
+            })
+
+        return tags
+
+    @staticmethod
+    def get_ingredients(recipe_ids):
+        ingredients = defaultdict(list)
+        for row in IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by("id").values(
+            "recipe_id",
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        ):
+            ingredients[row["recipe_id"]].append({
+                "id": row["ingredient_id"],
+                "name": row["ingredient__name"],
+                "measurement_unit": row["ingredient__measurement_unit"],
+                "amount": row["amount"],
+            })
+
+        return ingredients
+
+    def get_image_url(self, image_name):
+        if not image_name:
+            return None
+
+        return self.request.build_absolute_uri(self.storage.url(image_name))
+
+    def represent_recipe(self, row, author, tags, ingredients):
+        variants = get_variant_urls_by_name(
+            row["image"], row["image_variants_source"], self.storage
+        )
+        return {
+            "id": row["id"],
+            "author": author,
+            "tags": tags,
+            "ingredients": ingredients,
+            "is_favorited": row["is_favorited"],
+            "is_in_shopping_cart": row["is_in_shopping_cart"],
+            "image_variants": get_absolute_variants(variants, self.request),
+            "name": row["name"],
+            "text": row["text"],
+            "cooking_time": row["cooking_time"],
+            "image": self.get_image_url(row["image"]),
+            "favorites_count": row["favorites_count"],
+        }
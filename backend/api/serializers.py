@@ -1,23 +1,50 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import exceptions, serializers
 
+from api.metrics import TimedSerializerMixin
 from api.pagination import PageNumberPagination
-from recipes.constants import IngredientValidAmount, RecipeValidTime
+from recipes.constants import (
+    BulkList,
+    IngredientValidAmount,
+    RecipeValidTime,
+)
+from recipes.images import get_variant_urls
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingTotal,
     Tag,
 )
+from recipes.totals import change_recipe
 from users.models import Subscription, User
 
 
-class CustomUserSerializer(UserSerializer):
+def get_image_variants(recipe, request=None):
+    """Абсолютные адреса вариантов изображения рецепта."""
+    return get_absolute_variants(get_variant_urls(recipe), request)
+
+
+def get_absolute_variants(variants, request=None):
+    if variants is None or request is None:
+        return variants
+
+    return {
+        variant: {
+            extension: request.build_absolute_uri(url)
+            for extension, url in urls.items()
+        }
+        for variant, urls in variants.items()
+    }
+
+
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     """Проверка подписки."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -34,6 +61,9 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+
         user_id = self.context.get("request").user.id
         return Subscription.objects.filter(
             author=obj.id, user=user_id
@@ -64,7 +94,7 @@ class SubscriptionSerializer(CustomUserSerializer, PageNumberPagination):
     first_name = serializers.ReadOnlyField(source="author.first_name")
     last_name = serializers.ReadOnlyField(source="author.last_name")
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source="author.recipes.count")
+    recipes_count = serializers.ReadOnlyField(source="author.recipes_count")
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -80,12 +110,19 @@ class SubscriptionSerializer(CustomUserSerializer, PageNumberPagination):
             "recipes_count",
         )
 
-    def get_recipes_count(self, obj):
-        """Количество рецептов автора."""
-        return Recipe.objects.filter(author=obj.id).count()
+    def get_is_subscribed(self, obj):
+        """Подписка текущего пользователя на автора."""
+        return True
 
     def get_recipes(self, obj):
-        author_recipes = obj.author.recipes.all()
+        authors_recipes = self.context.get("authors_recipes")
+        if authors_recipes is not None:
+            author_recipes = authors_recipes.get(obj.author_id, [])
+        else:
+            author_recipes = obj.author.recipes.all()
+            limit = self.context.get("recipes_limit")
+            if limit is not None:
+                author_recipes = author_recipes[:limit]
 
         if author_recipes:
             serializer = ShortRecipeSerializer(
@@ -114,13 +151,13 @@ class SubscriptionSerializer(CustomUserSerializer, PageNumberPagination):
         return data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Для ингредиентов."""
 
     class Meta:
@@ -131,17 +168,25 @@ class IngredientSerializer(serializers.ModelSerializer):
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="ingredient.id")
     name = serializers.ReadOnlyField(source="ingredient.name")
-    unit_of_measurement = serializers.ReadOnlyField(
-        source="ingredient.unit_of_measurement"
+    measurement_unit = serializers.ReadOnlyField(
+        source="ingredient.measurement_unit"
     )
 
     class Meta:
         model = IngredientInRecipe
-        fields = ("id", "name", "unit_of_measurement", "amount")
+        fields = ("id", "name", "measurement_unit", "amount")
+
+
+class ShoppingTotalSerializer(RecipeIngredientsSerializer):
+    """Ингредиент и суммарное количество в списке покупок."""
+
+    class Meta:
+        model = ShoppingTotal
+        fields = ("id", "name", "measurement_unit", "amount")
 
 
 class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=[
             MinValueValidator(
@@ -157,37 +202,51 @@ class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ("id", "amount")
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     tags = TagSerializer(many=True)
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     def get_ingredients(self, obj):
-        ingredients = IngredientInRecipe.objects.filter(recipe=obj)
+        ingredients = obj.ingredientinrecipe_set.all()
         serializer = RecipeIngredientsSerializer(ingredients, many=True)
 
         return serializer.data
 
     def get_is_favorited(self, obj):
         """Добавлен ли рецепт в избранное."""
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
+
         user_id = self.context.get("request").user.id
         return Favorite.objects.filter(user=user_id, recipe=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
         """Добавлен ли рецепт в список покупок."""
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
+
         user_id = self.context.get("request").user.id
         return ShoppingCart.objects.filter(
             user=user_id, recipe=obj.id
         ).exists()
 
+    def get_image_variants(self, obj):
+        return get_image_variants(obj, self.context.get("request"))
+
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = (
+            "pub_date", "image_variants_source", "in_carts_count", "tags_mask"
+        )
 
 
-class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
+class RecipeCreateUpdateSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     author = CustomUserSerializer(read_only=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
@@ -222,35 +281,98 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
 
         ingredients = [item["id"] for item in value]
-        for ingredient in ingredients:
-            if ingredients.count(ingredient) > 1:
-                raise exceptions.ValidationError(
-                    "Рецепт не может включать два одинаковых ингредиента!"
-                )
+        if len(set(ingredients)) != len(ingredients):
+            raise exceptions.ValidationError(
+                "Рецепт не может включать два одинаковых ингредиента!"
+            )
+
+        existing = Ingredient.objects.in_bulk(ingredients)
+        missing = [pk for pk in ingredients if pk not in existing]
+        if missing:
+            raise exceptions.ValidationError(
+                f"Ингредиенты не существуют: {missing}."
+            )
+
+        for item in value:
+            item["id"] = existing[item["id"]]
 
         return value
 
+    def set_ingredients(self, recipe, ingredients, created=False):
+        """Сохранение ингредиентов рецепта по разнице с текущими.
+
+        Не больше трех запросов на запись: вставка новых, обновление
+        количества и удаление лишних строк IngredientInRecipe. Та же
+        разница применяется к итогам списков покупок с этим рецептом.
+        """
+        amounts = {
+            ingredient["id"].id: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        existing = {}
+        if not created:
+            # Блокировка рецепта до конца транзакции: параллельные
+            # изменения считают разницу по очереди, а не от одних и тех
+            # же строк, и итоги списков покупок не меняются дважды.
+            Recipe.objects.select_for_update().values_list("pk").get(
+                pk=recipe.pk
+            )
+            existing = {
+                row.ingredient_id: row
+                for row in recipe.ingredientinrecipe_set.all()
+            }
+        old_amounts = {
+            ingredient_id: row.amount
+            for ingredient_id, row in existing.items()
+        }
+
+        to_create = [
+            IngredientInRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        to_update = []
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                to_update.append(row)
+        to_delete = [
+            row.id for ingredient_id, row in existing.items()
+            if ingredient_id not in amounts
+        ]
+
+        if to_delete:
+            IngredientInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ("amount",))
+        if to_create:
+            IngredientInRecipe.objects.bulk_create(to_create)
+
+        if not created:
+            change_recipe(recipe.id, {
+                ingredient_id: (
+                    amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in amounts.keys() | old_amounts.keys()
+            })
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients_amounts = []
         author = self.context.get("request").user
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
 
         recipe = Recipe.objects.create(author=author, **validated_data)
         recipe.tags.set(tags)
-
-        for ingredient in ingredients:
-            amount = ingredient.get("amount")
-            ingredient = get_object_or_404(
-                Ingredient, pk=ingredient.get("id").id
-            )
-        ingredients_amounts.append(IngredientInRecipe(
-            recipe=recipe, ingredient=ingredient, amount=amount))
-
-        IngredientInRecipe.objects.bulk_create(ingredients_amounts)
+        self.set_ingredients(recipe, ingredients, created=True)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags", None)
         if tags is not None:
@@ -258,23 +380,21 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
         ingredients = validated_data.pop("ingredients", None)
         if ingredients is not None:
-            instance.ingredients.clear()
-
-            for ingredient in ingredients:
-                amount = ingredient.get("amount")
-                ingredient = get_object_or_404(
-                    Ingredient, pk=ingredient.get("id").id
-                )
-
-                IngredientInRecipe.objects.update_or_create(
-                    recipe=instance,
-                    ingredient=ingredient,
-                    defaults={"amount": amount},
-                )
+            self.set_ingredients(instance, ingredients)
 
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            (instance,),
+            Prefetch(
+                "ingredientinrecipe_set",
+                queryset=IngredientInRecipe.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            ),
+            Prefetch("tags", queryset=Tag.objects.order_by("id")),
+        )
         serializer = RecipeSerializer(
             instance, context={"request": self.context.get("request")}
         )
@@ -283,10 +403,27 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = (
+            "pub_date", "image_variants_source", "in_carts_count", "tags_mask"
+        )
+
 
+class ShortRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj):
+        return get_image_variants(obj, self.context.get("request"))
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BulkList.MAX_IDS,
+    )
@@ -0,0 +1,98 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import (
+    bump_ingredients_version,
+    bump_recipes_version,
+    bump_tags_version,
+)
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    RecipeTags,
+    Tag,
+)
+from users.models import User
+
+# Поля пользователя, которые попадают в ответы с рецептами.
+USER_RECIPE_FIELDS = {"email", "username", "first_name", "last_name"}
+# Поля, после изменения которых пользователь из кэша токенов устаревает:
+# доступ и профиль, который отдает /api/users/me/.
+USER_AUTH_FIELDS = (
+    "password",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    *sorted(USER_RECIPE_FIELDS),
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Снимок каталога ингредиентов устаревает при любом изменении."""
+    bump_ingredients_version()
+    bump_recipes_version()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Реестр тегов устаревает при любом изменении."""
+    bump_tags_version()
+    bump_recipes_version()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver((post_save, post_delete), sender=RecipeTags)
+@receiver(m2m_changed, sender=RecipeTags)
+def recipe_changed(sender, **kwargs):
+    """Кэш ответов с рецептами устаревает при изменении их данных."""
+    bump_recipes_version()
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    """Вход пользователя (last_login) не меняет ответы с рецептами."""
+    if update_fields is None or USER_RECIPE_FIELDS & set(update_fields):
+        bump_recipes_version()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход через djoser и удаление токена."""
+    token_cache.invalidate(instance.key)
+
+
+def get_auth_state(user):
+    """Значения полей доступа; отложенные (only/defer) не загружаются."""
+    return tuple(user.__dict__.get(field) for field in USER_AUTH_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._auth_state = get_auth_state(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация, изменение прав и профиля.
+
+    Сохранения без изменения этих полей (счетчики, last_login) токены
+    не трогают и запроса к Token не делают.
+    """
+    auth_state = get_auth_state(instance)
+    if created or auth_state == instance._auth_state:
+        return
+
+    instance._auth_state = auth_state
+    token_cache.invalidate(
+        *Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
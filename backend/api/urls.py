@@ -5,7 +5,8 @@ from api.views import (
     IngredientViewSet,
     RecipeViewSet,
     TagViewSet,
-    CustomUserViewSet
+    CustomUserViewSet,
+    MetricsView,
 )
 
 app_name = "api"
@@ -16,6 +17,7 @@ router.register("tags", TagViewSet)
 router.register("users", CustomUserViewSet, basename="users")
 
 urlpatterns = [
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path("", include(router.urls)),
     path("auth/", include("djoser.urls.authtoken")),
 ]
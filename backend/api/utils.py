@@ -0,0 +1,143 @@
+import csv
+import io
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import Recipe, ShoppingTotal
+
+SHOPPING_LIST_TITLE = "Список покупок:"
+PDF_FONT_NAME = "ShoppingListFont"
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+STREAM_CHUNK_SIZE = 8192
+
+
+def get_local_host():
+    """Допустимый Host для запросов тестовым клиентом из команд."""
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else ""
+    return "localhost" if host in ("", "*") else host.lstrip(".")
+
+
+def get_recipes_limit(request):
+    """Значение параметра recipes_limit или None."""
+    try:
+        limit = int(request.query_params.get("recipes_limit"))
+    except (TypeError, ValueError):
+        return None
+
+    return limit if limit >= 0 else None
+
+
+def get_authors_recipes(author_ids, limit=None):
+    """Последние рецепты авторов одним запросом, сгруппированные по автору.
+
+    При заданном limit для каждого автора берется не больше limit
+    рецептов: ROW_NUMBER() с разбиением по автору.
+    """
+    grouped = defaultdict(list)
+    if not author_ids:
+        return grouped
+
+    recipes = (
+        Recipe.objects.filter(author__in=author_ids)
+        .only(
+            "id", "name", "image", "image_variants_source", "cooking_time",
+            "author_id",
+        )
+        .order_by("-pub_date", "-id")
+    )
+
+    if limit is not None:
+        ranked = recipes.order_by().annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=F("author"),
+            order_by=(F("pub_date").desc(), F("id").desc()),
+        ))
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f"SELECT * FROM ({sql}) ranked "
+            "WHERE ranked.recipe_rank <= %s "
+            "ORDER BY ranked.recipe_rank",
+            (*params, limit),
+        )
+
+    for recipe in recipes:
+        grouped[recipe.author_id].append(recipe)
+
+    return grouped
+
+
+def get_shopping_list(user):
+    """Готовые итоги списка покупок: чтение без агрегации по рецептам."""
+    return (
+        ShoppingTotal.objects.filter(user=user)
+        .values("ingredient__name", "ingredient__measurement_unit", "amount")
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+    )
+
+
+def shopping_list_txt(items):
+    yield f"{SHOPPING_LIST_TITLE}\n"
+    for item in items.iterator():
+        yield (
+            f"{item['ingredient__name']}: {item['amount']}, "
+            f"{item['ingredient__measurement_unit']}\n"
+        )
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Количество", "Единица измерения"))
+    for item in items.iterator():
+        yield writer.writerow((
+            item["ingredient__name"],
+            item["amount"],
+            item["ingredient__measurement_unit"],
+        ))
+
+
+def shopping_list_pdf(items):
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+        )
+
+    buffer = io.BytesIO()
+    document = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    document.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+    position = height - PDF_MARGIN
+
+    for line in shopping_list_txt(items):
+        if position < PDF_MARGIN:
+            document.showPage()
+            document.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+            position = height - PDF_MARGIN
+        document.drawString(PDF_MARGIN, position, line.rstrip("\n"))
+        position -= PDF_LINE_HEIGHT
+
+    document.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(STREAM_CHUNK_SIZE), b"")
+
+
+SHOPPING_LIST_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", shopping_list_txt),
+    "csv": ("text/csv; charset=utf-8", shopping_list_csv),
+    "pdf": ("application/pdf", shopping_list_pdf),
+}
@@ -1,23 +1,42 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from functools import partial
+
+from django.conf import settings
+from django.db.models import (
+    BooleanField, Exists, OuterRef, Prefetch, Value,)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import filters, status, viewsets
+from rest_framework import filters, generics, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (
-    IsAuthenticated, IsAuthenticatedOrReadOnly,)
+    IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly,)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.cache import ingredients_catalog, recipes_cache, tags_registry
 from api.filters import RecipeFilter
+from api.metrics import registry
 from api.permissions import IsAdminAuthorOrReadOnly
+from api.representations import RecipeReader
+from api.renderers import CsvRenderer, PdfRenderer, TxtRenderer
 from api.serializers import (
     IngredientSerializer,
     RecipeCreateUpdateSerializer,
+    RecipeIdsSerializer,
     RecipeSerializer,
+    ShoppingTotalSerializer,
     ShortRecipeSerializer,
     SubscriptionSerializer,
     TagSerializer,)
+from api.utils import (
+    SHOPPING_LIST_FORMATS,
+    get_authors_recipes,
+    get_recipes_limit,
+    get_shopping_list,
+)
+from recipes.lists import add_to_list, remove_from_list
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -40,10 +59,21 @@ class CustomUserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Список авторов, на которых подписан пользователь."""
         user = self.request.user
-        queryset = user.followers.exclude(id=user.id)
+        queryset = (
+            user.followers.exclude(author=user)
+            .select_related("author")
+            .order_by("-id")
+        )
         pages = self.paginate_queryset(queryset)
+        authors_recipes = get_authors_recipes(
+            [subscription.author_id for subscription in pages],
+            get_recipes_limit(request),
+        )
         serializer = SubscriptionSerializer(
-            pages, many=True, context={"request": request}
+            pages, many=True, context={
+                "request": request,
+                "authors_recipes": authors_recipes,
+            }
         )
         return self.get_paginated_response(serializer.data)
 
@@ -57,7 +87,9 @@ class CustomUserViewSet(UserViewSet):
         queryset = Subscription.objects.create(
             author=author, user=request.user)
         serializer = SubscriptionSerializer(queryset, context={
-            "request": request})
+            "request": request,
+            "recipes_limit": get_recipes_limit(request),
+        })
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -85,6 +117,10 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов отдается из реестра воркера с ETag."""
+        return tags_registry.response(request)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
@@ -93,6 +129,13 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ("^name",)
 
+    def list(self, request, *args, **kwargs):
+        """Полный каталог отдается готовым снимком с ETag."""
+        if filters.SearchFilter.search_param in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        return ingredients_catalog.response(request)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -100,6 +143,78 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Рецепты с флагами избранного и списка покупок."""
+        user = self.request.user
+        queryset = super().get_queryset().prefetch_related(
+            Prefetch("author", queryset=User.objects.annotate(
+                is_subscribed=Exists(Subscription.objects.filter(
+                    user=user.id, author=OuterRef("pk")
+                ))
+            )),
+            Prefetch(
+                "ingredientinrecipe_set",
+                queryset=IngredientInRecipe.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            ),
+            Prefetch("tags", queryset=Tag.objects.order_by("id")),
+        )
+
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+    def list(self, request, *args, **kwargs):
+        get_response = partial(super().list, request, *args, **kwargs)
+        if settings.RECIPES_FAST_READ:
+            get_response = partial(self.read_list, request)
+
+        return recipes_cache.response(request, self.action, get_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if settings.RECIPES_FAST_READ:
+            get_response = partial(self.read_detail, request)
+
+        return recipes_cache.response(
+            request,
+            self.action,
+            get_response,
+            pk=kwargs.get(self.lookup_field),
+        )
+
+    def read_list(self, request):
+        """Список рецептов из строк values() без сериализатора."""
+        reader = RecipeReader(request)
+        rows = reader.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+
+        return Response(reader.represent(rows))
+
+    def read_detail(self, request):
+        """Рецепт из строки values() без сериализатора."""
+        reader = RecipeReader(request)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            reader.get_rows(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        return Response(reader.represent((row,))[0])
+
     def get_serializer_class(self):
         if self.action in ("create", "partial_update"):
             return RecipeCreateUpdateSerializer
@@ -109,7 +224,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def add(self, model, user, pk, name):
         """Добавление рецепта."""
         recipe = get_object_or_404(Recipe, pk=pk)
-        model.objects.create(user=user, recipe=recipe)
+        _, created = model.objects.get_or_create(user=user, recipe=recipe)
+        if not created:
+            return Response(
+                {"errors": f"Рецепт уже добавлен в {name}!"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -164,38 +284,97 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.delete_relation(ShoppingCart, user, pk, name)
 
+    def change_list(self, request, change, model):
+        """Массовое изменение списка: итог по каждому id рецепта."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = change(
+            model, request.user, serializer.validated_data["ids"]
+        )
+        return Response({"results": results})
+
+    @action(
+        detail=False,
+        methods=("post",),
+        permission_classes=(IsAuthenticated,),
+        url_path="favorite",
+        url_name="favorite_bulk",
+    )
+    def favorite_bulk(self, request):
+        """Добавление рецептов в избранное списком id."""
+        return self.change_list(request, add_to_list, Favorite)
+
+    @favorite_bulk.mapping.delete
+    def unfavorite_bulk(self, request):
+        """Удаление рецептов из избранного списком id."""
+        return self.change_list(request, remove_from_list, Favorite)
+
+    @action(
+        detail=False,
+        methods=("post",),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart",
+        url_name="shopping_cart_bulk",
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление рецептов в список покупок списком id."""
+        return self.change_list(request, add_to_list, ShoppingCart)
+
+    @shopping_cart_bulk.mapping.delete
+    def remove_from_cart_bulk(self, request):
+        """Удаление рецептов из списка покупок списком id."""
+        return self.change_list(request, remove_from_list, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart/totals",
+        url_name="shopping_cart_totals",
+    )
+    def shopping_cart_totals(self, request):
+        """Текущие итоги списка покупок по ингредиентам."""
+        totals = (
+            request.user.shopping_totals.select_related("ingredient")
+            .order_by("ingredient__name", "ingredient__measurement_unit")
+        )
+        return Response(ShoppingTotalSerializer(totals, many=True).data)
+
     @action(
         detail=False,
         methods=("get",),
         permission_classes=(IsAuthenticated,),
         url_path="download_shopping_cart",
         url_name="download_shopping_cart",
+        renderer_classes=(
+            TxtRenderer, CsvRenderer, PdfRenderer, JSONRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        shopping_cart = ShoppingCart.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        buy = (
-            IngredientInRecipe.objects.filter(recipe__in=recipes)
-            .values("ingredient")
-            .annotate(amount=Sum("amount"))
-            .order_by("ingredient__name")
+        """Скачивание списка покупок в формате txt, csv или pdf."""
+        file_format = request.accepted_renderer.format
+        if file_format not in SHOPPING_LIST_FORMATS:
+            file_format = TxtRenderer.format
+        content_type, render = SHOPPING_LIST_FORMATS[file_format]
+
+        response = StreamingHttpResponse(
+            render(get_shopping_list(request.user)),
+            content_type=content_type,
         )
-
-        purchased = [
-            "Список покупок:",
-        ]
-        for item in buy:
-            ingredient = Ingredient.objects.get(pk=item["ingredient"])
-            amount = item["amount"]
-            purchased.append(
-                f"{ingredient.name}: {amount}, "
-                f"{ingredient.measurement_unit}"
-            )
-        purchased_in_file = "\n".join(purchased)
-
-        response = HttpResponse(purchased_in_file, content_type="text/plain")
         response[
             "Content-Disposition"
-        ] = "attachment; filename=shopping-list.txt"
+        ] = f"attachment; filename=shopping-list.{file_format}"
 
         return response
+
+
+class MetricsView(APIView):
+    """Метрики запросов воркера в текстовом формате Prometheus."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,85 @@
+from contextlib import closing
+from functools import partial
+
+from foodgram.db.pool import PoolTimeout, get_pool
+
+
+class ReusableConnectionMixin:
+    """Проверка постоянного соединения и необязательный пул.
+
+    CONN_HEALTH_CHECKS: перед первым запросом в каждом HTTP-запросе
+    соединение, открытое раньше, проверяется SELECT 1 и при ошибке
+    (например, после перезапуска базы) переоткрывается.
+    POOL: соединения берутся из общего для потоков пула воркера и
+    возвращаются в него в конце запроса; из пула выдаются только
+    соединения, прошедшие проверку.
+    """
+
+    health_check_done = False
+
+    @property
+    def pool(self):
+        if not self.settings_dict.get("POOL"):
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def check_connection(self, connection):
+        try:
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT 1")
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        connect = partial(super().get_new_connection, conn_params)
+        pool = self.pool
+        if pool is None:
+            return connect()
+
+        try:
+            return pool.acquire(connect, self.check_connection)
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        pool.release(
+            self.connection,
+            reusable=(
+                not self.in_atomic_block
+                and not self.errors_occurred
+                and self.autocommit == self.settings_dict["AUTOCOMMIT"]
+            ),
+        )
+
+    def close_if_unusable_or_obsolete(self):
+        self.health_check_done = False
+        if self.pool is not None and not self.in_atomic_block:
+            self.close()
+            return
+
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or self.health_check_done
+            or not self.settings_dict.get("CONN_HEALTH_CHECKS")
+        ):
+            return
+
+        if not self.check_connection(self.connection):
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,21 @@
+class DenormalizedFieldsMixin:
+    """save() не перезаписывает поля, которые меняются только UPDATE с F().
+
+    Иначе сохранение ранее загруженного объекта вернет в базу
+    устаревшие значения счетчиков.
+    """
+
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not (
+            self._state.adding
+            or kwargs.get("force_insert")
+            or kwargs.get("update_fields") is not None
+        ):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
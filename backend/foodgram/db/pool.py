@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Общие для потоков воркера соединения с базой.
+
+    Соединение выдается из свободных (последнее возвращенное первым),
+    иначе открывается новое, пока не достигнут max_size, иначе поток
+    ждет не дольше timeout секунд. Соединения старше max_age секунд
+    закрываются при возврате и выдаче.
+    """
+
+    def __init__(self, max_size, timeout, max_age=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self._idle = deque()
+        self._created = {}
+        self._condition = threading.Condition()
+        self.in_use = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.opened = 0
+        self.discarded = 0
+
+    def is_expired(self, created):
+        return (
+            self.max_age is not None
+            and time.monotonic() - created >= self.max_age
+        )
+
+    def take(self):
+        """Свободное соединение или None, если можно открыть новое."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._condition:
+            while not self._idle and self.in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"Нет свободных соединений за {self.timeout} с."
+                    )
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self._condition.wait(remaining)
+
+            self.in_use += 1
+            return self._idle.pop() if self._idle else None
+
+    def acquire(self, connect, check):
+        """Рабочее соединение: проверенное check() или новое."""
+        entry = self.take()
+        try:
+            if entry is not None:
+                connection, created = entry
+                if not self.is_expired(created) and check(connection):
+                    self._created[id(connection)] = created
+                    return connection
+                self.discard(connection)
+
+            connection = connect()
+        except BaseException:
+            self.put_back(None)
+            raise
+
+        self._created[id(connection)] = time.monotonic()
+        with self._condition:
+            self.opened += 1
+        return connection
+
+    def release(self, connection, reusable=True):
+        created = self._created.pop(id(connection), None)
+        entry = (connection, created)
+        if not reusable or created is None or self.is_expired(created):
+            self.discard(connection)
+            entry = None
+        self.put_back(entry)
+
+    def put_back(self, entry):
+        with self._condition:
+            self.in_use -= 1
+            if entry is not None:
+                self._idle.append(entry)
+            self._condition.notify()
+
+    def discard(self, connection):
+        with self._condition:
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "opened": self.opened,
+                "discarded": self.discarded,
+            }
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict["POOL"]
+            _pools[alias] = ConnectionPool(
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 5),
+                max_age=settings_dict["CONN_MAX_AGE"],
+            )
+        return _pools[alias]
+
+
+def get_pools_stats():
+    """Статистика пулов соединений этого процесса по алиасам баз."""
+    with _pools_lock:
+        pools = dict(_pools)
+
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from foodgram.db.mixins import ReusableConnectionMixin
+
+
+class DatabaseWrapper(ReusableConnectionMixin, base.DatabaseWrapper):
+    pass
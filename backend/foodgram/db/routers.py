@@ -0,0 +1,57 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = "default"
+
+# Модели, которые всегда читаются из основной базы: токен только что
+# вошедшего пользователя мог еще не дойти до реплики.
+PRIMARY_MODELS = {"authtoken.token"}
+
+_local = threading.local()
+
+
+def get_replicas():
+    """Алиасы реплик — все базы из DATABASES, кроме основной."""
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+@contextmanager
+def read_from(alias):
+    """Чтения потока внутри блока идут в базу alias."""
+    previous = getattr(_local, "alias", None)
+    _local.alias = alias
+    try:
+        yield
+    finally:
+        _local.alias = previous
+
+
+class ReplicaRouter:
+    """Чтения внутри read_from — из реплики, все остальное — в основную.
+
+    Без read_from (изменяющие запросы, фоновые потоки, команды) и внутри
+    транзакции основной базы запросы идут в основную базу. Миграции
+    выполняются только в ней, на реплики схема приходит репликацией.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_local, "alias", None)
+        if (
+            alias is None
+            or model._meta.label_lower in PRIMARY_MODELS
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -34,11 +34,13 @@ INSTALLED_APPS = [
     "sorl.thumbnail",
     "django_filters",
     "users",
-    "api",
-    "recipes",
+    "api.apps.ApiConfig",
+    "recipes.apps.RecipesConfig",
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -71,12 +73,23 @@ WSGI_APPLICATION = "foodgram.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+# foodgram.db.postgresql — бэкенд Django для PostgreSQL с проверкой
+# постоянного соединения (CONN_HEALTH_CHECKS) и пулом для потоков
+# воркера (POOL, включается DB_POOL_MAX_SIZE > 0 при gunicorn --threads).
+# С пулом CONN_MAX_AGE ограничивает жизнь соединения в пуле.
+
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", default=0))
+DB_ENGINE = os.getenv("DB_ENGINE", default="foodgram.db.postgresql")
+# Постоянные соединения по умолчанию только у бэкенда, который их
+# проверяет: иначе после перезапуска PostgreSQL запросы получат 500.
+DB_CONN_MAX_AGE = int(os.getenv(
+    "DB_CONN_MAX_AGE",
+    default=60 if DB_ENGINE.startswith("foodgram.db.") else 0,
+))
 
 DATABASES = {
     "default": {
-        "ENGINE": os.getenv(
-            "DB_ENGINE", default="django.db.backends.postgresql"
-        ),
+        "ENGINE": DB_ENGINE,
         "NAME": os.getenv("DB_NAME", default="foodgram"),
         "USER": os.getenv("POSTGRES_USER", default="foodgram_user"),
         "PASSWORD": os.getenv(
@@ -84,6 +97,14 @@ DATABASES = {
         ),
         "HOST": os.getenv("DB_HOST", default="localhost"),
         "PORT": os.getenv("DB_PORT", default="5432"),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": os.getenv(
+            "DB_CONN_HEALTH_CHECKS", "True"
+        ).lower() == "true",
+        "POOL": {
+            "MAX_SIZE": DB_POOL_MAX_SIZE,
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", default=5)),
+        } if DB_POOL_MAX_SIZE > 0 else None,
     }
 
     # 'default': {
@@ -92,6 +113,81 @@ DATABASES = {
     # }
 }
 
+# Реплики только для чтения: DB_REPLICAS — хосты через запятую (для
+# SQLite — пути к файлам), остальные параметры как у основной базы.
+# Безопасные запросы к API читают из случайной реплики, после записи
+# клиент DB_REPLICA_STICKY_SECONDS секунд читает из основной базы
+# (foodgram.db.routers, api.middleware.ReplicaMiddleware). Отметки о
+# записи хранятся в кэше default, поэтому при WEB_CONCURRENCY > 1
+# (число воркеров gunicorn) реплики требуют общего кэша.
+
+DB_REPLICAS = [
+    location.strip()
+    for location in os.getenv("DB_REPLICAS", default="").split(",")
+    if location.strip()
+]
+DB_REPLICA_FIELD = (
+    "NAME" if "sqlite" in DB_ENGINE else "HOST"
+)
+for number, location in enumerate(DB_REPLICAS, 1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        DB_REPLICA_FIELD: location,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["foodgram.db.routers.ReplicaRouter"]
+
+DB_REPLICA_STICKY_SECONDS = int(
+    os.getenv("DB_REPLICA_STICKY_SECONDS", default=10)
+)
+DB_REPLICA_STICKY_COOKIE = "db_sticky"
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", default=1))
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Версии снимков хранятся в кэше: для нескольких воркеров gunicorn и
+# команд вроде get_of_ingredients нужен общий бэкенд, например
+# django.core.cache.backends.filebased.FileBasedCache (при
+# WEB_CONCURRENCY > 1 без него — проверка api.W001).
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
+    }
+}
+
+# Заголовок Server-Timing (время и число SQL-запросов) для всех клиентов;
+# по умолчанию только для персонала (is_staff).
+SERVER_TIMING_PUBLIC = os.getenv(
+    "SERVER_TIMING_PUBLIC", "False"
+).lower() == "true"
+
+# Срок жизни ответов анонимным пользователям: счетчики избранного
+# меняются без смены версии данных и отстают не дольше этого времени.
+RECIPES_CACHE_TIMEOUT = int(os.getenv("RECIPES_CACHE_TIMEOUT", default=60))
+
+# Список и карточка рецепта собираются из строк values() без полей
+# RecipeSerializer (api.representations); False — через сериализатор.
+RECIPES_FAST_READ = os.getenv("RECIPES_FAST_READ", "True").lower() == "true"
+
+# Кэш токенов аутентификации: пустой алиас — LRU в памяти воркера
+# (выход в другом воркере виден через AUTH_TOKEN_CACHE_TIMEOUT секунд),
+# иначе алиас общего бэкенда из CACHES.
+AUTH_TOKEN_CACHE_ALIAS = os.getenv("AUTH_TOKEN_CACHE_ALIAS", default="")
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", default=60)
+)
+AUTH_TOKEN_CACHE_MAX_SIZE = int(
+    os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", default=10000)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,7 +242,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "SEARCH_PARAM": "name",
     "DEFAULT_PAGINATION_CLASS": "api.pagination.LimitPagination",
@@ -166,3 +262,8 @@ DJOSER = {
     },
     "HIDE_USERS": False,
 }
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
@@ -1,16 +1,27 @@
 from django.contrib import admin
 
-from .models import (Ingredient, Recipe, Tag)
+from .models import (Ingredient, Recipe, ShoppingCart, Tag)
+from .totals import rebuild_totals
 
 
 class RecipeIngredientsInLine(admin.TabularInline):
     model = Recipe.ingredients.through
     extra = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "recipe", "ingredient"
+        )
 
 
 class RecipeTagsInLine(admin.TabularInline):
     model = Recipe.tags.through
     extra = 1
+    autocomplete_fields = ("tag",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("recipe", "tag")
 
 
 @admin.register(Tag)
@@ -23,18 +34,36 @@ class TagAdmin(admin.ModelAdmin):
     list_display_links = ('name',)
     search_fields = ('name',)
     list_filter = ('name',)
+    ordering = ('name',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "text", "pub_date", "author")
-    search_fields = ("name", "author")
+    list_display = (
+        "id", "name", "text", "pub_date", "author", "favorites_count"
+    )
+    list_select_related = ("author",)
+    raw_id_fields = ("author",)
+    search_fields = ("name", "author__username", "author__email")
+    show_full_result_count = False
     inlines = (RecipeIngredientsInLine, RecipeTagsInLine)
     empty_value_display = "-пусто-"
 
+    def save_related(self, request, form, formsets, change):
+        """Ингредиенты изменены в админке: итоги списков покупок с этим
+        рецептом пересобираются."""
+        super().save_related(request, form, formsets, change)
+        if change:
+            rebuild_totals(
+                ShoppingCart.objects.filter(recipe=form.instance).values(
+                    "user_id"
+                )
+            )
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "measurement_unit")
     search_fields = ("name",)
+    ordering = ("name",)
     empty_value_display = "-пусто-"
@@ -9,6 +9,25 @@ class IngredientFieldLength:
     MEASUREMENT_UNIT = 15
 
 
+class TagMask:
+    # Тег с id N — бит N - 1 в знаковом bigint; старший бит не занимаем.
+    MAX_TAG_ID = 63
+    UPDATE_BATCH_SIZE = 500
+
+
+class ShoppingTotals:
+    BATCH_SIZE = 500
+
+
+class BulkList:
+    MAX_IDS = 100
+    ADDED = "added"
+    EXISTS = "exists"
+    REMOVED = "removed"
+    ABSENT = "absent"
+    NOT_FOUND = "not_found"
+
+
 class RecipeValidTime:
     MIN_COOKING_TIME = 1
     MAX_COOKING_TIME = 9999
@@ -18,3 +37,18 @@ class IngredientValidAmount:
     MIN_AMOUNT = 1
     MAX_AMOUNT = 50
     MIN_INGREDIENT_AMOUNT = 1
+
+
+class ImageVariants:
+    UPLOAD_TO = "recipes/variants/"
+    WIDTHS = {"card": 400, "detail": 800, "retina": 1600}
+    FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+    QUALITY = 80
+    WORKERS = 1
+
+
+class ImageStorage:
+    LOCK_NAME = ".recipe_images.lock"
+    # Сохраненный или повторно использованный файл столько секунд не
+    # удаляется: ссылающийся на него рецепт может быть еще не закоммичен.
+    RELEASE_GRACE_SECONDS = 3600
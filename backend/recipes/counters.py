@@ -0,0 +1,114 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.constants import TagMask
+from recipes.models import Favorite, Recipe, RecipeTags, ShoppingCart
+from users.models import Subscription, User
+
+LIST_COUNTERS = {
+    Favorite: "favorites_count",
+    ShoppingCart: "in_carts_count",
+}
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарное изменение счетчика одним UPDATE."""
+    if not delta:
+        return
+
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_related(model, field):
+    """Количество строк model, ссылающихся на текущую запись."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_list(model, recipe_ids):
+    """Счетчик списка model (избранное, покупки) у рецептов recipe_ids."""
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            **{LIST_COUNTERS[model]: count_related(model, "recipe")}
+        )
+
+
+def get_tags_mask(tag_ids):
+    """Битовая маска тегов; теги с id больше MAX_TAG_ID в нее не входят."""
+    mask = 0
+    for tag_id in tag_ids:
+        if 0 < tag_id <= TagMask.MAX_TAG_ID:
+            mask |= 1 << (tag_id - 1)
+
+    return mask
+
+
+def change_tags_mask(recipes, tag_ids, add):
+    """Установка или снятие битов тегов у recipes одним UPDATE."""
+    mask = get_tags_mask(tag_ids)
+    if not mask:
+        return
+
+    recipes.update(
+        tags_mask=(
+            F("tags_mask").bitor(mask) if add
+            else F("tags_mask").bitand(~mask)
+        )
+    )
+
+
+def set_tags_mask(recipe_id):
+    Recipe.objects.filter(pk=recipe_id).update(
+        tags_mask=get_tags_mask(
+            RecipeTags.objects.filter(recipe_id=recipe_id).values_list(
+                "tag_id", flat=True
+            )
+        )
+    )
+
+
+def recount_tags_mask():
+    """Маски тегов всех рецептов по таблице RecipeTags."""
+    masks = defaultdict(int)
+    for recipe_id, tag_id in RecipeTags.objects.values_list(
+        "recipe_id", "tag_id"
+    ).iterator():
+        masks[recipe_id] |= get_tags_mask((tag_id,))
+
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        recipes_by_mask[mask].append(recipe_id)
+
+    Recipe.objects.exclude(tags_mask=0).update(tags_mask=0)
+    for mask, recipe_ids in recipes_by_mask.items():
+        for start in range(0, len(recipe_ids), TagMask.UPDATE_BATCH_SIZE):
+            Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + TagMask.UPDATE_BATCH_SIZE]
+            ).update(tags_mask=mask)
+
+
+def recount():
+    """Пересчет всех счетчиков по фактическим данным."""
+    Recipe.objects.update(**{
+        field: count_related(model, "recipe")
+        for model, field in LIST_COUNTERS.items()
+    })
+    User.objects.update(
+        recipes_count=count_related(Recipe, "author"),
+        followers_count=count_related(Subscription, "author"),
+    )
+    recount_tags_mask()
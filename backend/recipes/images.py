@@ -0,0 +1,187 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image
+
+from recipes.constants import ImageVariants
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=ImageVariants.WORKERS, thread_name_prefix="image-variants"
+)
+
+
+def get_variant_name(image_name, variant, extension):
+    """Путь варианта изображения: зависит только от имени оригинала."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return os.path.join(
+        ImageVariants.UPLOAD_TO, f"{stem}_{variant}.{extension}"
+    )
+
+
+def get_variant_names(image_name):
+    return {
+        variant: {
+            extension: get_variant_name(image_name, variant, extension)
+            for extension in ImageVariants.FORMATS
+        }
+        for variant in ImageVariants.WIDTHS
+    }
+
+
+def has_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants_source == recipe.image.name
+    )
+
+
+def open_rgb(image_file):
+    """Изображение в RGB; прозрачность заливается белым для JPEG."""
+    with Image.open(image_file) as image:
+        image.load()
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+
+        return image.convert("RGB")
+
+
+def resize_to_width(image, width):
+    if image.width <= width:
+        return image
+
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_image_variants(recipe):
+    """Сохранение всех вариантов изображения рецепта в хранилище."""
+    image_name = recipe.image.name
+    with recipe.image.open("rb") as image_file:
+        original = open_rgb(image_file)
+
+    names = get_variant_names(image_name)
+    for variant, width in ImageVariants.WIDTHS.items():
+        image = resize_to_width(original, width)
+        for extension, image_format in ImageVariants.FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(
+                buffer, image_format, quality=ImageVariants.QUALITY,
+                optimize=True,
+            )
+            name = names[variant][extension]
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def variants_exist(image_name):
+    """Варианты уже собраны: имя оригинала по содержимому у нескольких
+    рецептов общее, и варианты у них тоже общие."""
+    return all(
+        default_storage.exists(name)
+        for names in get_variant_names(image_name).values()
+        for name in names.values()
+    )
+
+
+def generate_image_variants(recipe_id):
+    from api.cache import bump_recipes_version
+    from recipes.models import Recipe
+
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is not None and recipe.image and not has_variants(recipe):
+            image_name = recipe.image.name
+            if not variants_exist(image_name):
+                build_image_variants(recipe)
+            # Изображение могли заменить, пока собирались варианты.
+            Recipe.objects.filter(pk=recipe.pk, image=image_name).update(
+                image_variants_source=image_name
+            )
+            bump_recipes_version()
+    except Exception:
+        logger.exception(
+            "Не удалось собрать варианты изображения рецепта %s", recipe_id
+        )
+    finally:
+        connection.close()
+
+
+def schedule_image_variants(recipe):
+    """Сборка вариантов в фоновом потоке после коммита транзакции."""
+    recipe_id = recipe.pk
+    transaction.on_commit(
+        lambda: executor.submit(generate_image_variants, recipe_id)
+    )
+
+
+def release_image(image_name):
+    """Удаление изображения и его вариантов, если на него больше не
+    ссылается ни один рецепт.
+
+    Проверка и удаление идут под блокировкой хранилища, а недавно
+    сохраненный файл остается: загрузка того же содержимого могла
+    найти его и еще не закоммитить рецепт. Такие файлы позже удаляет
+    команда collect_recipe_images. Возвращает, удален ли файл.
+    """
+    from recipes.models import Recipe
+
+    storage = Recipe._meta.get_field("image").storage
+    if not image_name:
+        return False
+
+    with storage.lock():
+        if (
+            not storage.exists(image_name)
+            or storage.is_recent(image_name)
+            or Recipe.objects.filter(image=image_name).exists()
+        ):
+            return False
+
+        storage.delete(image_name)
+        for names in get_variant_names(image_name).values():
+            for name in names.values():
+                default_storage.delete(name)
+
+    return True
+
+
+def schedule_image_release(image_name):
+    transaction.on_commit(lambda: release_image(image_name))
+
+
+def get_variant_urls(recipe):
+    """Адреса вариантов изображения; до их сборки — адрес оригинала."""
+    return get_variant_urls_by_name(
+        recipe.image.name, recipe.image_variants_source, recipe.image.storage
+    )
+
+
+def get_variant_urls_by_name(image_name, variants_source, storage):
+    """То же по имени файла, например из строки values()."""
+    if not image_name:
+        return None
+
+    if image_name != variants_source:
+        url = storage.url(image_name)
+        return {
+            variant: {extension: url for extension in ImageVariants.FORMATS}
+            for variant in ImageVariants.WIDTHS
+        }
+
+    return {
+        variant: {
+            extension: default_storage.url(name)
+            for extension, name in names.items()
+        }
+        for variant, names in get_variant_names(image_name).items()
+    }
@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.db import connection, transaction
+
+from recipes.constants import IngredientFieldLength
+from recipes.models import Ingredient
+
+JSON_CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ["name", "measurement_unit"]
+STAGING_TABLE = "ingredient_import"
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row != CSV_HEADER:
+            yield row
+
+
+def read_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def skip_separators(buffer, opened):
+    """Пропуск пробелов, открывающей скобки и запятых между объектами."""
+    buffer = buffer.lstrip()
+    if not opened and buffer:
+        if buffer[0] != "[":
+            raise ValueError("Ожидается JSON-массив.")
+        opened = True
+        buffer = buffer[1:].lstrip()
+
+    while buffer[:1] == ",":
+        buffer = buffer[1:].lstrip()
+
+    return buffer, opened
+
+
+def read_json(file, chunk_size=JSON_CHUNK_SIZE):
+    """Потоковый разбор JSON-массива без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    opened = False
+    chunk = True
+    while chunk:
+        chunk = file.read(chunk_size)
+        buffer, opened = skip_separators(buffer + chunk, opened)
+        while opened and buffer:
+            if buffer[0] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield record
+            buffer, opened = skip_separators(buffer[end:], opened)
+
+    raise ValueError("JSON-массив не закрыт.")
+
+
+READERS = {
+    "csv": read_csv,
+    "json": read_json,
+    "ndjson": read_ndjson,
+    "jsonl": read_ndjson,
+}
+
+
+def parse_row(record):
+    """Название и единица измерения из строки CSV или объекта JSON."""
+    if isinstance(record, dict):
+        record = (record.get("name"), record.get("measurement_unit"))
+
+    if not isinstance(record, (list, tuple)) or len(record) != 2:
+        raise ValueError("ожидается название и единица измерения")
+
+    name, measurement_unit = (
+        str(value or "").strip() for value in record
+    )
+    if not name or not measurement_unit:
+        raise ValueError("пустое значение")
+    if (
+        len(name) > IngredientFieldLength.NAME_MAX_LENGTH
+        or len(measurement_unit) > IngredientFieldLength.MEASUREMENT_UNIT
+    ):
+        raise ValueError("слишком длинное значение")
+
+    return name, measurement_unit
+
+
+def get_single_units(rows):
+    """Названия, у которых в пачке ровно одна единица измерения."""
+    units = defaultdict(set)
+    for name, measurement_unit in rows:
+        units[name].add(measurement_unit)
+
+    return {name for name, values in units.items() if len(values) == 1}
+
+
+class IngredientImporter:
+    """Загрузка ингредиентов пачками с подсчетом результата.
+
+    Пара (название, единица) уже в базе — строка пропускается.
+    С update=True единица измерения обновляется, если название
+    однозначно: в базе одна запись с ним, а в пачке одна единица.
+    Иначе добавляется новый ингредиент.
+    """
+
+    def __init__(self, batch_size=1000, update=False, on_error=None):
+        self.batch_size = batch_size
+        self.update = update
+        self.on_error = on_error
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.invalid = 0
+
+    @property
+    def skipped(self):
+        return self.rows - self.inserted - self.updated
+
+    def run(self, records):
+        records = iter(records)
+        with transaction.atomic():
+            self.prepare()
+            chunk = list(islice(records, self.batch_size))
+            while chunk:
+                batch = self.parse(chunk)
+                if batch:
+                    self.merge(batch)
+                chunk = list(islice(records, self.batch_size))
+
+    def parse(self, chunk):
+        batch = []
+        for record in chunk:
+            self.rows += 1
+            try:
+                batch.append(parse_row(record))
+            except ValueError as error:
+                self.invalid += 1
+                if self.on_error:
+                    self.on_error(f"Строка {self.rows}: {error}: {record}")
+
+        return batch
+
+    def prepare(self):
+        pass
+
+    def merge(self, batch):
+        rows = list(dict.fromkeys(batch))
+        existing = defaultdict(list)
+        for ingredient in Ingredient.objects.filter(
+            name__in={name for name, _ in rows}
+        ):
+            existing[ingredient.name].append(ingredient)
+
+        single_units = get_single_units(rows) if self.update else set()
+        to_create = []
+        to_update = []
+        for name, measurement_unit in rows:
+            ingredients = existing[name]
+            if any(
+                ingredient.measurement_unit == measurement_unit
+                for ingredient in ingredients
+            ):
+                continue
+            if len(ingredients) == 1 and name in single_units:
+                ingredients[0].measurement_unit = measurement_unit
+                to_update.append(ingredients[0])
+            else:
+                to_create.append(
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                )
+
+        Ingredient.objects.bulk_update(to_update, ("measurement_unit",))
+        Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
+        self.updated += len(to_update)
+        self.inserted += len(to_create)
+
+
+class PostgresIngredientImporter(IngredientImporter):
+    """COPY пачки во временную таблицу и слияние через ON CONFLICT."""
+
+    def prepare(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+                f"name varchar({IngredientFieldLength.NAME_MAX_LENGTH}), "
+                "measurement_unit "
+                f"varchar({IngredientFieldLength.MEASUREMENT_UNIT})"
+                ") ON COMMIT DROP"
+            )
+
+    def merge(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} (name, measurement_unit) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            if self.update:
+                cursor.execute(
+                    f"UPDATE {table} AS i "
+                    "SET measurement_unit = s.measurement_unit "
+                    "FROM (SELECT name, MIN(measurement_unit) "
+                    f"AS measurement_unit FROM {STAGING_TABLE} "
+                    "GROUP BY name "
+                    "HAVING COUNT(DISTINCT measurement_unit) = 1) AS s "
+                    "WHERE i.name = s.name "
+                    "AND i.measurement_unit <> s.measurement_unit "
+                    f"AND NOT EXISTS (SELECT 1 FROM {table} AS o "
+                    "WHERE o.name = i.name AND o.id <> i.id)"
+                )
+                self.updated += cursor.rowcount
+
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                f"SELECT DISTINCT name, measurement_unit FROM {STAGING_TABLE} "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING"
+            )
+            self.inserted += cursor.rowcount
+
+
+def get_importer(**kwargs):
+    if connection.vendor == "postgresql":
+        return PostgresIngredientImporter(**kwargs)
+
+    return IngredientImporter(**kwargs)
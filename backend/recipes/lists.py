@@ -0,0 +1,93 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.constants import BulkList
+from recipes.counters import recount_list
+from recipes.models import Recipe, ShoppingCart
+from recipes.totals import add_recipes
+
+
+def get_presence(model, user, recipe_ids):
+    """{id рецепта: есть ли он в списке} одним запросом; несуществующих
+    рецептов в результате нет."""
+    return dict(
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .annotate(
+            present=Exists(
+                model.objects.filter(user=user, recipe=OuterRef("pk"))
+            )
+        )
+        .values_list("pk", "present")
+    )
+
+
+def get_outcomes(recipe_ids, statuses):
+    return [
+        {"id": pk, "status": statuses.get(pk, BulkList.NOT_FOUND)}
+        for pk in recipe_ids
+    ]
+
+
+def delete_from_list(model, user, recipe_ids):
+    """Один DELETE без сигналов: QuerySet.delete() при подписанных
+    обработчиках удаляет записи по одной."""
+    quote = connection.ops.quote_name
+    meta = model._meta
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(meta.db_table)} "
+            f"WHERE {quote(meta.get_field('user').column)} = %s "
+            f"AND {quote(meta.get_field('recipe').column)} "
+            f"IN ({placeholders})",
+            [user.id, *recipe_ids],
+        )
+
+
+@transaction.atomic
+def add_to_list(model, user, recipe_ids):
+    """Добавление рецептов в список пользователя одним INSERT.
+
+    Записи создаются через bulk_create без сигналов, поэтому счетчик
+    списка у затронутых рецептов и итоги списка покупок меняются здесь
+    же.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    statuses = {
+        pk: BulkList.EXISTS if present else BulkList.ADDED
+        for pk, present in get_presence(model, user, recipe_ids).items()
+    }
+    added = [pk for pk in recipe_ids if statuses.get(pk) == BulkList.ADDED]
+    model.objects.bulk_create(
+        [model(user=user, recipe_id=pk) for pk in added],
+        ignore_conflicts=True,
+    )
+    recount_list(model, added)
+    if model is ShoppingCart:
+        add_recipes(user.id, added)
+
+    return get_outcomes(recipe_ids, statuses)
+
+
+@transaction.atomic
+def remove_from_list(model, user, recipe_ids):
+    """Удаление рецептов из списка пользователя одним DELETE.
+
+    Записи удаляются без сигналов, поэтому счетчик списка у затронутых
+    рецептов и итоги списка покупок меняются здесь же.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    statuses = {
+        pk: BulkList.REMOVED if present else BulkList.ABSENT
+        for pk, present in get_presence(model, user, recipe_ids).items()
+    }
+    removed = [
+        pk for pk in recipe_ids if statuses.get(pk) == BulkList.REMOVED
+    ]
+    if removed:
+        delete_from_list(model, user, removed)
+    recount_list(model, removed)
+    if model is ShoppingCart:
+        add_recipes(user.id, removed, sign=-1)
+
+    return get_outcomes(recipe_ids, statuses)
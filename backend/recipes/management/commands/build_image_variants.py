@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.images import build_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Сборка недостающих вариантов изображений рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересобрать варианты для всех рецептов",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.exclude(image_variants_source=F("image"))
+
+        built = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                build_image_variants(recipe)
+            except Exception as err:
+                failed += 1
+                self.stderr.write(f"Рецепт {recipe.pk}: {err}")
+            else:
+                built += 1
+
+        self.stdout.write(
+            f"Собрано вариантов: {built}, ошибок: {failed}."
+        )
@@ -0,0 +1,78 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.constants import ImageStorage, ImageVariants
+from recipes.images import release_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаление изображений рецептов, на которые не ссылается ни один "
+        "рецепт, и вариантов уже удаленных изображений. Файлы моложе "
+        "RELEASE_GRACE_SECONDS остаются до следующего запуска."
+    )
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field("image")
+        originals = set(self.get_originals(field.storage, field.upload_to))
+        referenced = set(
+            Recipe.objects.exclude(image="").values_list("image", flat=True)
+        )
+        released = sum(
+            release_image(name) for name in sorted(originals - referenced)
+        )
+        orphans = self.delete_orphan_variants(field.storage)
+
+        self.stdout.write(
+            f"Удалено изображений: {released}, "
+            f"вариантов без оригинала: {orphans}."
+        )
+
+    @staticmethod
+    def get_originals(storage, directory):
+        """Оригиналы: <каталог>/ab/<хэш>.<расш> и файлы со старыми именами
+        прямо в каталоге; каталог вариантов пропускается."""
+        if not storage.exists(directory):
+            return
+
+        variants = posixpath.basename(ImageVariants.UPLOAD_TO.rstrip("/"))
+        directories, files = storage.listdir(directory)
+        for file_name in files:
+            yield posixpath.join(directory, file_name)
+        for subdirectory in directories:
+            if subdirectory == variants:
+                continue
+            subdirectory = posixpath.join(directory, subdirectory)
+            for file_name in storage.listdir(subdirectory)[1]:
+                yield posixpath.join(subdirectory, file_name)
+
+    def delete_orphan_variants(self, storage):
+        directory = ImageVariants.UPLOAD_TO
+        if not default_storage.exists(directory):
+            return 0
+
+        field = Recipe._meta.get_field("image")
+        stems = {
+            posixpath.splitext(posixpath.basename(name))[0]
+            for name in self.get_originals(storage, field.upload_to)
+        }
+        deadline = timezone.now() - timedelta(
+            seconds=ImageStorage.RELEASE_GRACE_SECONDS
+        )
+        deleted = 0
+        with storage.lock():
+            for file_name in default_storage.listdir(directory)[1]:
+                name = posixpath.join(directory, file_name)
+                if (
+                    file_name.rsplit("_", 1)[0] not in stems
+                    and default_storage.get_modified_time(name) < deadline
+                ):
+                    default_storage.delete(name)
+                    deleted += 1
+
+        return deleted
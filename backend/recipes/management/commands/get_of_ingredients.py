@@ -1,42 +1,75 @@
-import csv
 import os
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from recipes.models import Ingredient
+from api.cache import bump_ingredients_version, bump_recipes_version
+from recipes.importers import READERS, get_importer
 
 
 class Command(BaseCommand):
-    help = "Загрузка данных из csv файла в модель Ingredient"
+    help = (
+        "Потоковая загрузка ингредиентов из csv, json или ndjson файла "
+        "пачками с обновлением существующих записей"
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("--path", type=str, help="Путь к файлу")
+        parser.add_argument(
+            "--path",
+            type=str,
+            help="Путь к файлу или к папке с ingredients.csv",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Формат файла; по умолчанию определяется по расширению",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Обновлять единицу измерения у ингредиента с тем же "
+                 "названием",
+        )
 
     def handle(self, *args, **options):
-        print("Ожидайте, загрузка...")
-        file_name = "ingredients.csv"
-        file_path = os.path.join(options["path"], file_name)
+        file_path = options["path"] or "data/"
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "ingredients.csv")
 
-        ingredients_to_create = []
+        file_format = options["format"] or (
+            os.path.splitext(file_path)[1].lstrip(".").lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(
+                f"Неизвестный формат файла {file_path}, укажите --format."
+            )
 
-        with open(file_path, "r") as csv_file:
-            reader = csv.reader(csv_file)
+        importer = get_importer(
+            batch_size=options["batch_size"],
+            update=options["update"],
+            on_error=self.stderr.write,
+        )
+        self.stdout.write("Ожидайте, загрузка...")
+        started = time.perf_counter()
+        with open(file_path, encoding="utf-8", newline="") as file:
+            try:
+                importer.run(READERS[file_format](file))
+            except ValueError as error:
+                raise CommandError(f"Ошибка в файле {file_path}: {error}")
+        elapsed = time.perf_counter() - started
 
-            for row in reader:
-                name_csv = 0
-                measurement_unit_csv = 1
+        if importer.inserted or importer.updated:
+            bump_ingredients_version()
+        if importer.updated:
+            # Единицы измерения выводятся и в сохраненных ответах рецептов.
+            bump_recipes_version()
 
-                try:
-                    ingredient = Ingredient(
-                        name=row[name_csv],
-                        measurement_unit=row[measurement_unit_csv],
-                    )
-                    ingredients_to_create.append(ingredient)
-                except Exception as err:
-                    print(f"Ошибка в строке {row}: {err}")
-
-        if ingredients_to_create:
-            Ingredient.objects.bulk_create(
-                ingredients_to_create, ignore_conflicts=True)
-
-        print("Данные успешно загружены в модель.")
+        self.stdout.write(
+            f"Добавлено: {importer.inserted}, "
+            f"обновлено: {importer.updated}, "
+            f"пропущено: {importer.skipped} "
+            f"(с ошибками: {importer.invalid}). "
+            f"{importer.rows} строк за {elapsed:.1f} с, "
+            f"{importer.rows / elapsed if elapsed else 0:.0f} строк/с."
+        )
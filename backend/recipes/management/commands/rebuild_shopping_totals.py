@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.totals import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "Пересборка итогов списков покупок по их содержимому"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rebuild_totals()
+        self.stdout.write(self.style.SUCCESS("Итоги пересобраны."))
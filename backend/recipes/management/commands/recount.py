@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчет счетчиков избранного, списков покупок, рецептов "
+        "и подписчиков по фактическим данным"
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recount()
+        self.stdout.write(self.style.SUCCESS("Счетчики пересчитаны."))
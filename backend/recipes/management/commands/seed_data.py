@@ -0,0 +1,207 @@
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.cache import bump_tags_version
+from recipes.counters import recount
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    RecipeTags,
+    ShoppingCart,
+    Tag,
+)
+from recipes.totals import rebuild_totals
+from users.models import Subscription, User
+
+BATCH_SIZE = 500
+SEED_IMAGE_NAME = "recipes/seed.png"
+SEED_PASSWORD = "seed-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение базы тестовыми данными заданного объема "
+        "(ингредиенты должны быть загружены заранее)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=5)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8
+        )
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--cart-per-user", type=int, default=10)
+        parser.add_argument(
+            "--subscriptions-per-user", type=int, default=5
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1, help="Зерно генератора"
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                "Нет ингредиентов: сначала выполните get_of_ingredients."
+            )
+
+        tag_ids = self.create_tags(options["tags"])
+        user_ids = self.create_users(options["users"])
+        recipe_ids = self.create_recipes(options["recipes"], user_ids)
+        self.add_recipe_relations(
+            recipe_ids,
+            tag_ids,
+            ingredient_ids,
+            options["ingredients_per_recipe"],
+        )
+        self.add_user_relations(user_ids, recipe_ids, options)
+        # bulk_create не отправляет сигналы, счетчики и итоги списков
+        # покупок считаются заново.
+        recount()
+        rebuild_totals()
+
+        self.stdout.write(
+            f"Создано: пользователей {len(user_ids)}, "
+            f"рецептов {len(recipe_ids)}, тегов {len(tag_ids)}."
+        )
+
+    def sample(self, population, size):
+        return self.random.sample(population, min(size, len(population)))
+
+    def create_tags(self, count):
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(
+                name=f"Тег {number}",
+                slug=f"seed-tag-{number}",
+                color=f"#{self.random.randrange(0x1000000):06x}",
+            )
+            for number in range(existing, count)
+        )
+        bump_tags_version()
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_users(self, count):
+        start = (User.objects.order_by("-id").values_list(
+            "id", flat=True
+        ).first() or 0) + 1
+        password = make_password(SEED_PASSWORD)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f"seed{number}",
+                    email=f"seed{number}@example.com",
+                    first_name="Тест",
+                    last_name=f"Пользователь {number}",
+                    password=password,
+                )
+                for number in range(start, start + count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        emails = [user.email for user in users]
+        return list(
+            User.objects.filter(email__in=emails).values_list("id", flat=True)
+        )
+
+    def get_image_name(self):
+        if not default_storage.exists(SEED_IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new("RGB", (600, 400), (230, 120, 40)).save(buffer, "PNG")
+            default_storage.save(SEED_IMAGE_NAME, ContentFile(
+                buffer.getvalue()
+            ))
+
+        return SEED_IMAGE_NAME
+
+    def create_recipes(self, count, user_ids):
+        if not user_ids:
+            return []
+
+        image = self.get_image_name()
+        last_id = Recipe.objects.order_by("-id").values_list(
+            "id", flat=True
+        ).first() or 0
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=f"Рецепт {number}",
+                    text=f"Описание тестового рецепта {number}.",
+                    cooking_time=self.random.randint(5, 180),
+                    image=image,
+                    author_id=self.random.choice(user_ids),
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return list(
+            Recipe.objects.filter(id__gt=last_id).values_list("id", flat=True)
+        )
+
+    def add_recipe_relations(
+        self, recipe_ids, tag_ids, ingredient_ids, ingredients_per_recipe
+    ):
+        IngredientInRecipe.objects.bulk_create(
+            (
+                IngredientInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 50),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in self.sample(
+                    ingredient_ids, ingredients_per_recipe
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        RecipeTags.objects.bulk_create(
+            (
+                RecipeTags(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.sample(tag_ids, self.random.randint(1, 2))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def add_user_relations(self, user_ids, recipe_ids, options):
+        for model, per_user in (
+            (Favorite, options["favorites_per_user"]),
+            (ShoppingCart, options["cart_per_user"]),
+        ):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in self.sample(recipe_ids, per_user)
+                ),
+                batch_size=BATCH_SIZE,
+            )
+
+        per_user = options["subscriptions_per_user"]
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in [
+                    author_id
+                    for author_id in self.sample(user_ids, per_user + 1)
+                    if author_id != user_id
+                ][:per_user]
+            ),
+            batch_size=BATCH_SIZE,
+        )
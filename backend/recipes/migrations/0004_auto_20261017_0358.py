@@ -0,0 +1,110 @@
+# Generated by Django 2.2.16 on 2026-10-17 03:58
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+INGREDIENT_NAME_INDEX = "ingredient_name_upper_idx"
+INGREDIENT_NAME_INDEX_SQL = {
+    "postgresql": (
+        f"CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} "
+        "ON recipes_ingredient (UPPER(name::text) text_pattern_ops)"
+    ),
+    "sqlite": (
+        f"CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} "
+        "ON recipes_ingredient (name COLLATE NOCASE)"
+    ),
+}
+
+
+def merge_duplicates(apps, schema_editor):
+    """Повторы ингредиента и тега в рецепте перед уникальными ограничениями.
+
+    Инлайны админки позволяли добавить ингредиент в рецепт дважды:
+    количества повторов складываются в первую строку, повторы тегов
+    удаляются.
+    """
+    db = schema_editor.connection.alias
+    IngredientInRecipe = apps.get_model("recipes", "IngredientInRecipe")
+    RecipeTags = apps.get_model("recipes", "RecipeTags")
+
+    ingredients = IngredientInRecipe.objects.using(db)
+    duplicates = ingredients.order_by().values(
+        "recipe_id", "ingredient_id"
+    ).annotate(
+        count=Count("id"), first_id=Min("id"), total=Sum("amount")
+    ).filter(count__gt=1)
+    for row in duplicates:
+        ingredients.filter(pk=row["first_id"]).update(amount=row["total"])
+        ingredients.filter(
+            recipe_id=row["recipe_id"], ingredient_id=row["ingredient_id"]
+        ).exclude(pk=row["first_id"]).delete()
+
+    tags = RecipeTags.objects.using(db)
+    duplicates = tags.order_by().values("recipe_id", "tag_id").annotate(
+        count=Count("id"), first_id=Min("id")
+    ).filter(count__gt=1)
+    for row in duplicates:
+        tags.filter(
+            recipe_id=row["recipe_id"], tag_id=row["tag_id"]
+        ).exclude(pk=row["first_id"]).delete()
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    """Индекс для поиска ингредиентов по началу названия (^name).
+
+    istartswith в PostgreSQL выполняется как UPPER(name::text) LIKE ...,
+    в SQLite как LIKE, который использует только индекс с NOCASE.
+    В Django 2.2 такие индексы можно создать только SQL-запросом.
+    """
+    sql = INGREDIENT_NAME_INDEX_SQL.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql)
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor in INGREDIENT_NAME_INDEX_SQL:
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_auto_20231110_1702'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'default_related_name': 'shopping_list', 'verbose_name': 'Список покупок', 'verbose_name_plural': 'Список покупок'},
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetags',
+            index=models.Index(fields=['tag', 'recipe'], name='recipe_tag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='cart_recipe_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientinrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredient_in_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipetags',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='unique_recipe_tag'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
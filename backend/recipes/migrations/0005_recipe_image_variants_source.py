@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_auto_20261017_0358'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Изображение, для которого собраны варианты'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+SEARCH_FUNCTION = "recipe_search_vector_update"
+SEARCH_TRIGGER = "recipe_search_vector_trigger"
+FTS_TABLE = "recipes_recipe_fts"
+
+CREATE_SEARCH_SQL = {
+    "postgresql": (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector",
+        f"CREATE FUNCTION {SEARCH_FUNCTION}() RETURNS trigger AS $$ "
+        "BEGIN NEW.search_vector := "
+        "setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') "
+        "|| setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B'); "
+        "RETURN NEW; END $$ LANGUAGE plpgsql",
+        f"CREATE TRIGGER {SEARCH_TRIGGER} "
+        "BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe "
+        f"FOR EACH ROW EXECUTE PROCEDURE {SEARCH_FUNCTION}()",
+        "UPDATE recipes_recipe SET name = name",
+        "CREATE INDEX recipe_search_vector_idx ON recipes_recipe "
+        "USING GIN (search_vector)",
+        "CREATE INDEX recipe_name_trgm_idx ON recipes_recipe "
+        "USING GIN (name gin_trgm_ops)",
+    ),
+    "sqlite": (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "name, text, content='recipes_recipe', content_rowid='id', "
+        "tokenize='unicode61')",
+        f"CREATE TRIGGER {FTS_TABLE}_insert "
+        "AFTER INSERT ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END",
+        f"CREATE TRIGGER {FTS_TABLE}_delete "
+        "AFTER DELETE ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+        "VALUES ('delete', old.id, old.name, old.text); END",
+        f"CREATE TRIGGER {FTS_TABLE}_update "
+        "AFTER UPDATE OF name, text ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+        "VALUES ('delete', old.id, old.name, old.text); "
+        f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END",
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')",
+    ),
+}
+
+DROP_SEARCH_SQL = {
+    "postgresql": (
+        "DROP INDEX IF EXISTS recipe_name_trgm_idx",
+        "DROP INDEX IF EXISTS recipe_search_vector_idx",
+        f"DROP TRIGGER IF EXISTS {SEARCH_TRIGGER} ON recipes_recipe",
+        f"DROP FUNCTION IF EXISTS {SEARCH_FUNCTION}()",
+        "ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector",
+    ),
+    "sqlite": (
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+        f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    """Полнотекстовый индекс по названию и описанию рецепта.
+
+    PostgreSQL: столбец tsvector (русская конфигурация), который
+    заполняет триггер, GIN-индекс по нему и триграммный индекс по
+    названию. SQLite: внешняя таблица FTS5 с триггерами синхронизации.
+    Модель эти объекты не описывает, запросы к ним в recipes.search.
+    """
+    for sql in CREATE_SEARCH_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_SEARCH_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_auto_20261017_0406'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
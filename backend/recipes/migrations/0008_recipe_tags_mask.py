@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:14
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+MAX_TAG_ID = 63
+
+
+def fill_tags_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTags = apps.get_model('recipes', 'RecipeTags')
+    masks = defaultdict(int)
+    for recipe_id, tag_id in RecipeTags.objects.values_list(
+        'recipe_id', 'tag_id'
+    ).iterator():
+        if tag_id <= MAX_TAG_ID:
+            masks[recipe_id] |= 1 << (tag_id - 1)
+
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        recipes_by_mask[mask].append(recipe_id)
+
+    for mask, recipe_ids in recipes_by_mask.items():
+        for start in range(0, len(recipe_ids), 500):
+            Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + 500]
+            ).update(tags_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Битовая маска тегов'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['tags_mask'], name='recipe_tags_mask_idx'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+    ]
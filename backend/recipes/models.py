@@ -5,12 +5,14 @@ from django.core.validators import (
 )
 from django.db import models
 
+from foodgram.db.models import DenormalizedFieldsMixin
 from recipes.constants import (
     IngredientFieldLength,
     IngredientValidAmount,
     RecipeValidTime,
     TagFieldLength,
 )
+from recipes.storage import recipe_image_storage
 from users.models import User
 
 
@@ -73,7 +75,14 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(DenormalizedFieldsMixin, models.Model):
+    denormalized_fields = (
+        "image_variants_source",
+        "favorites_count",
+        "in_carts_count",
+        "tags_mask",
+    )
+
     name = models.CharField(
         max_length=TagFieldLength.NAME_MAX_LENGTH,
         verbose_name="Название рецепта",
@@ -106,6 +115,30 @@ class Recipe(models.Model):
         verbose_name="Изображение для рецепта",
         help_text="Изображение для рецепта",
         upload_to="recipes/",
+        storage=recipe_image_storage,
+        db_index=True,
+    )
+    image_variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="Изображение, для которого собраны варианты",
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В избранном",
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В списках покупок",
+    )
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Битовая маска тегов",
     )
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации рецепта",
@@ -130,6 +163,16 @@ class Recipe(models.Model):
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"), name="recipe_pub_date_id_idx"
+            ),
+            # Условие tags_mask & маска B-дерево не обслуживает: COUNT с
+            # фильтром по тегам читает этот узкий индекс целиком вместо
+            # таблицы (см. EXPECTED_COUNT_SCANS в check_query_plans).
+            models.Index(fields=("tags_mask",), name="recipe_tags_mask_idx"),
+        )
+
     def __str__(self):
         return self.name
 
@@ -158,6 +201,13 @@ class IngredientInRecipe(models.Model):
         verbose_name = "Ингредиенты"
         verbose_name_plural = "Ингредиенты"
 
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "ingredient"),
+                name="unique_ingredient_in_recipe",
+            ),
+        )
+
     def __str__(self):
         return f"В рецепте {self.recipe} есть ингредиент {self.ingredient}"
 
@@ -172,6 +222,15 @@ class RecipeTags(models.Model):
         verbose_name = "Теги"
         verbose_name_plural = "Теги"
 
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "tag"), name="unique_recipe_tag"
+            ),
+        )
+        indexes = (
+            models.Index(fields=("tag", "recipe"), name="recipe_tag_idx"),
+        )
+
     def __str__(self):
         return f"У рецепта {self.recipe} есть тег {self.tag}"
 
@@ -205,6 +264,11 @@ class Favorite(BaseList):
                 fields=("user", "recipe"), name="unique_favorite_recipe"
             ),
         )
+        indexes = (
+            models.Index(
+                fields=("recipe", "user"), name="favorite_recipe_user_idx"
+            ),
+        )
 
 
 class ShoppingCart(BaseList):
@@ -217,4 +281,44 @@ class ShoppingCart(BaseList):
                 fields=("user", "recipe"), name="unique_shopping_list_recipe"
             ),
         )
+        indexes = (
+            models.Index(
+                fields=("recipe", "user"), name="cart_recipe_user_idx"
+            ),
+        )
         default_related_name = "shopping_list"
+
+
+class ShoppingTotal(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Поддерживается при изменении списка покупок и ингредиентов рецептов
+    (recipes.totals), пересобирается командой rebuild_shopping_totals.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_totals",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_totals",
+        verbose_name="Ингредиент",
+    )
+    amount = models.IntegerField(default=0, verbose_name="Количество")
+
+    class Meta:
+        verbose_name = "Итог списка покупок"
+        verbose_name_plural = "Итоги списков покупок"
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"), name="unique_shopping_total"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.ingredient}: {self.amount} у пользователя {self.user}"
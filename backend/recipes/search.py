@@ -0,0 +1,116 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "russian"
+TRIGRAM_MAX_LENGTH = 3
+FTS_TABLE = "recipes_recipe_fts"
+WORD = re.compile(r"\w+")
+
+# Триггеры синхронизации FTS5 в SQLite. Django пересоздает таблицу
+# при части миграций, и триггеры старой таблицы удаляются вместе с ней.
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_insert": (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+        "AFTER INSERT ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END"
+    ),
+    f"{FTS_TABLE}_delete": (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+        "AFTER DELETE ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+        "VALUES ('delete', old.id, old.name, old.text); END"
+    ),
+    f"{FTS_TABLE}_update": (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+        "AFTER UPDATE OF name, text ON recipes_recipe BEGIN "
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+        "VALUES ('delete', old.id, old.name, old.text); "
+        f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END"
+    ),
+}
+
+
+def search_postgresql(queryset, words):
+    table = queryset.model._meta.db_table
+    query = " ".join(words)
+    if len(query) <= TRIGRAM_MAX_LENGTH:
+        # Короткий запрос — часть слова: ищем по триграммам названия.
+        condition = f"{table}.name ILIKE %s"
+        params = ["%{}%".format(query.replace("_", "\\_"))]
+        rank = f"similarity({table}.name, %s)"
+    else:
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        condition = f"{table}.search_vector @@ {tsquery}"
+        params = [query]
+        rank = f"ts_rank({table}.search_vector, {tsquery})"
+
+    return queryset.extra(where=[condition], params=params).annotate(
+        search_rank=RawSQL(rank, (query,), output_field=FloatField())
+    )
+
+
+def search_sqlite(queryset, words):
+    table = queryset.model._meta.db_table
+    # Каждое слово — строка FTS5 с поиском по началу слова.
+    match = " ".join('"{}"*'.format(word) for word in words)
+    condition = (
+        f"{table}.id IN (SELECT rowid FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s)"
+    )
+    rank = (
+        f"(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)"
+    )
+    return queryset.extra(where=[condition], params=[match]).annotate(
+        search_rank=RawSQL(rank, (match,), output_field=FloatField())
+    )
+
+
+def search_contains(queryset, words):
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(text__icontains=word)
+
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+SEARCHES = {
+    "postgresql": search_postgresql,
+    "sqlite": search_sqlite,
+}
+
+
+def search_recipes(queryset, query):
+    """Рецепты по названию и описанию, сначала самые релевантные."""
+    words = WORD.findall(query)
+    if not words:
+        return queryset
+
+    search = SEARCHES.get(connections[queryset.db].vendor, search_contains)
+    return search(queryset, words).order_by("-search_rank", "-pub_date", "-id")
+
+
+def ensure_sqlite_triggers(connection):
+    """Восстановление триггеров FTS5 и перестроение индекса в SQLite."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s "
+            "OR (type = 'trigger' AND tbl_name = 'recipes_recipe')",
+            (FTS_TABLE,),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in existing or set(SQLITE_TRIGGERS) <= existing:
+            return
+
+        for sql in SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"
+        )
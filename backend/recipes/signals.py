@@ -0,0 +1,136 @@
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from recipes.counters import change_counter, change_tags_mask, set_tags_mask
+from recipes.images import (
+    has_variants,
+    schedule_image_release,
+    schedule_image_variants,
+)
+from recipes.models import Favorite, Recipe, RecipeTags, ShoppingCart
+from recipes.search import ensure_sqlite_triggers
+from recipes.totals import add_recipes
+from users.models import Subscription, User
+
+
+def get_delta(signal, created=False):
+    """+1 для новой записи, -1 для удаленной, 0 для обновления."""
+    if signal is post_delete:
+        return -1
+
+    return 1 if created else 0
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Новое изображение рецепта: варианты собираются в фоне."""
+    if instance.image and not has_variants(instance):
+        schedule_image_variants(instance)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_replaced(sender, instance, update_fields=None, **kwargs):
+    """Прежнее изображение удаляется после коммита, если оно больше
+    ни у кого не используется."""
+    if instance._state.adding or (
+        update_fields is not None and "image" not in update_fields
+    ):
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        "image", flat=True
+    ).first()
+    if previous and previous != instance.image.name:
+        schedule_image_release(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    schedule_image_release(instance.image.name)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_counted(sender, instance, signal, created=False, **kwargs):
+    change_counter(
+        User, instance.author_id, "recipes_count", get_delta(signal, created)
+    )
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_counted(sender, instance, signal, created=False, **kwargs):
+    change_counter(
+        Recipe, instance.recipe_id, "favorites_count",
+        get_delta(signal, created),
+    )
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def cart_counted(sender, instance, signal, created=False, **kwargs):
+    change_counter(
+        Recipe, instance.recipe_id, "in_carts_count",
+        get_delta(signal, created),
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_added(sender, instance, created, **kwargs):
+    if created:
+        add_recipes(instance.user_id, (instance.recipe_id,))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_removed(sender, instance, **kwargs):
+    """До удаления: при удалении рецепта каскадом его ингредиенты
+    удаляются в той же операции."""
+    add_recipes(instance.user_id, (instance.recipe_id,), sign=-1)
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_counted(sender, instance, signal, created=False, **kwargs):
+    change_counter(
+        User, instance.author_id, "followers_count",
+        get_delta(signal, created),
+    )
+
+
+@receiver((post_save, post_delete), sender=RecipeTags)
+def recipe_tag_saved(sender, instance, **kwargs):
+    """Запись RecipeTags изменена по одной (например, в админке)."""
+    set_tags_mask(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=RecipeTags)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """recipe.tags.set()/add()/remove() меняют биты маски без чтения."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+        if action == "post_clear":
+            recipes.update(tags_mask=0)
+            return
+        change_tags_mask(recipes, pk_set, action == "post_add")
+    elif action == "post_clear":
+        change_tags_mask(Recipe.objects.all(), (instance.pk,), False)
+    else:
+        change_tags_mask(
+            Recipe.objects.filter(pk__in=pk_set), (instance.pk,),
+            action == "post_add",
+        )
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    """Триггеры поиска в SQLite могли пропасть при пересоздании таблицы."""
+    connection = connections[using]
+    if sender.name == "recipes" and connection.vendor == "sqlite":
+        ensure_sqlite_triggers(connection)
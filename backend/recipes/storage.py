@@ -0,0 +1,81 @@
+import fcntl
+import hashlib
+import os
+import posixpath
+from contextlib import contextmanager
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from recipes.constants import ImageStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы с именем по SHA-256 содержимого: <каталог>/ab/<хэш>.<расш>.
+
+    Одинаковое содержимое получает одно имя, и повторная загрузка не
+    пишет файл заново. Файл под таким именем не меняется, поэтому
+    nginx отдает его с неограниченным кэшированием (infra/nginx.conf).
+    Файл удаляется, когда на него не ссылается ни один рецепт и он не
+    сохранялся RELEASE_GRACE_SECONDS (recipes.images.release_image).
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, file_name = posixpath.split(name.replace("\\", "/"))
+        extension = os.path.splitext(file_name)[1].lower()
+        hexdigest = digest.hexdigest()
+        return posixpath.join(
+            directory, hexdigest[:2], f"{hexdigest}{extension}"
+        )
+
+    @contextmanager
+    def lock(self):
+        """Блокировка между потоками и процессами: сохранение файла
+        и его удаление не пересекаются."""
+        os.makedirs(self.location, exist_ok=True)
+        lock_path = os.path.join(self.location, ImageStorage.LOCK_NAME)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def is_recent(self, name):
+        """Файл сохранен или использован повторно недавно."""
+        age = timezone.now() - self.get_modified_time(name)
+        return age.total_seconds() < ImageStorage.RELEASE_GRACE_SECONDS
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'Имя файла "{name}" длиннее {max_length} символов.'
+            )
+
+        with self.lock():
+            if self.exists(name):
+                # Отметка об использовании: release_image не удалит файл,
+                # пока рецепт с ним не закоммичен.
+                os.utime(self.path(name))
+                return name
+
+            return super().save(name, content, max_length=max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
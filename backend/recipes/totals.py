@@ -0,0 +1,115 @@
+from itertools import islice
+
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.constants import ShoppingTotals
+from recipes.models import IngredientInRecipe, ShoppingCart, ShoppingTotal
+
+
+def get_amounts(recipe_ids):
+    """{id ингредиента: сумма количества} по рецептам recipe_ids."""
+    return dict(
+        IngredientInRecipe.objects.filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values("ingredient_id")
+        .annotate(total=Sum("amount"))
+        .values_list("ingredient_id", "total")
+    )
+
+
+def create_totals(totals, ignore_conflicts=False):
+    """Вставка итогов пачками, не собирая их все в памяти."""
+    totals = iter(totals)
+    batch = list(islice(totals, ShoppingTotals.BATCH_SIZE))
+    while batch:
+        ShoppingTotal.objects.bulk_create(
+            batch, ignore_conflicts=ignore_conflicts
+        )
+        batch = list(islice(totals, ShoppingTotals.BATCH_SIZE))
+
+
+def change_totals(user_ids, deltas):
+    """Прибавление deltas {id ингредиента: изменение} к итогам
+    пользователей user_ids (список или запрос): вставка недостающих
+    строк, один UPDATE и удаление обнулившихся."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    increased = [pk for pk, delta in deltas.items() if delta > 0]
+    if increased:
+        create_totals(
+            (
+                ShoppingTotal(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id in increased
+            ),
+            ignore_conflicts=True,
+        )
+    totals = ShoppingTotal.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    totals.update(
+        amount=F("amount") + Case(
+            *(
+                When(ingredient_id=pk, then=Value(delta))
+                for pk, delta in deltas.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    if len(increased) < len(deltas):
+        totals.filter(amount__lte=0).delete()
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """Рецепты добавлены в список покупок (sign=-1 — удалены)."""
+    change_totals(
+        (user_id,),
+        {
+            pk: sign * amount
+            for pk, amount in get_amounts(recipe_ids).items()
+        },
+    )
+
+
+def change_recipe(recipe_id, deltas):
+    """Изменение ингредиентов рецепта во всех списках с ним."""
+    if any(deltas.values()):
+        change_totals(
+            ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+                "user_id", flat=True
+            ),
+            deltas,
+        )
+
+
+def rebuild_totals(user_ids=None):
+    """Итоги по фактическому содержимому списков покупок.
+
+    Без user_ids пересобираются итоги всех пользователей.
+    """
+    totals = ShoppingTotal.objects.all()
+    rows = IngredientInRecipe.objects.all()
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+        rows = rows.filter(recipe__shopping_list__user_id__in=user_ids)
+    else:
+        rows = rows.filter(recipe__shopping_list__isnull=False)
+
+    totals.delete()
+    rows = (
+        rows.order_by()
+        .values("recipe__shopping_list__user_id", "ingredient_id")
+        .annotate(total=Sum("amount"))
+        .values_list(
+            "recipe__shopping_list__user_id", "ingredient_id", "total"
+        )
+    )
+    create_totals(
+        ShoppingTotal(
+            user_id=user_id, ingredient_id=ingredient_id, amount=total
+        )
+        for user_id, ingredient_id, total in rows.iterator()
+    )
@@ -8,5 +8,13 @@ class SubscriptionAdmin(admin.ModelAdmin):
     """Регистрируем подписку в админке."""
 
     list_display = ("id", "user", "author")
-    search_fields = ("user", "author")
+    list_select_related = ("user", "author")
+    raw_id_fields = ("user", "author")
+    search_fields = (
+        "user__username",
+        "user__email",
+        "author__username",
+        "author__email",
+    )
+    show_full_result_count = False
     empty_value_display = "-пусто-"
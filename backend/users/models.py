@@ -2,10 +2,11 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import CheckConstraint, Q, UniqueConstraint
 
+from foodgram.db.models import DenormalizedFieldsMixin
 from users.constants import UserFieldLength
 
 
-class User(AbstractUser):
+class User(DenormalizedFieldsMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',
@@ -19,6 +20,18 @@ class User(AbstractUser):
         max_length=UserFieldLength.EMAIL_MAX_LENGTH,
         unique=True,
     )
+    denormalized_fields = ("recipes_count", "followers_count")
+
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество рецептов",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество подписчиков",
+    )
 
     class Meta:
         ordering = ("id",)